@@ -0,0 +1,3 @@
+"""
+Các script đo hiệu năng cho gói core (chạy từ thư mục gốc: python -m benchmarks.<tên>)
+"""
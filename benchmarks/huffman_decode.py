@@ -0,0 +1,125 @@
+# benchmarks/huffman_decode.py
+"""So sánh tốc độ giải mã Huffman: duyệt cây từng bit (cách cũ) và giải mã bằng bảng tra.
+
+Chạy: python -m benchmarks.huffman_decode [--size 512] [--repeat 3]
+Thông lượng tính theo MB ảnh giải nén mỗi giây. Cột "không chỉ mục" giải mã cùng dữ liệu
+với metadata kiểu v2 (không có chỉ mục điểm đồng bộ), tức đường tự đồng bộ mà file v1/v2 dùng;
+ảnh "levels" (8 mức xám đều nhau, mọi mã dài 3 bit) là trường hợp mã không tự đồng bộ.
+"""
+import argparse
+import struct
+import time
+
+import numpy as np
+
+from core.huffman import (HuffmanCompressor, Node, _DICTIONARY_FLAG, _LENGTHS_SIZE, _canonical_codes,
+                          _unpack_lengths)
+
+
+def tree_from_codes(aligned: np.ndarray, lengths: np.ndarray) -> Node:
+    """Dựng lại cây Huffman từ bảng mã canonical để chạy bộ giải mã duyệt cây."""
+    root = Node()
+    for val in np.flatnonzero(lengths).tolist():
+        n = int(lengths[val])
+        code = int(aligned[val]) >> (64 - n)
+        node = root
+        for i in range(n - 1, -1, -1):
+            side = 'right' if (code >> i) & 1 else 'left'
+            if getattr(node, side) is None:
+                setattr(node, side, Node())
+            node = getattr(node, side)
+        node.val = val
+    return root
+
+
+def tree_walk_decode(data: bytes, metadata: bytes, shape: tuple) -> np.ndarray:
+    """Bộ giải mã cũ: đổi dữ liệu thành chuỗi '0'/'1' rồi đi cây từng bit.
+
+    Chỉ nhận metadata có bảng độ dài mã và không có biến đổi; chỉ mục điểm đồng bộ được bỏ qua.
+    """
+    padding = metadata[0]
+    if padding & _DICTIONARY_FLAG:
+        raise ValueError("Tree-walk decoder does not support Huffman dictionaries")
+    lengths = _unpack_lengths(metadata[1:1 + _LENGTHS_SIZE])
+    pos = 1 + _LENGTHS_SIZE
+    if len(metadata) > pos:
+        # Khoảng cách điểm đồng bộ (uint16) + chỉ mục (uint16 mỗi nhóm trừ nhóm cuối) + header biến đổi
+        interval = struct.unpack_from('<H', metadata, pos)[0]
+        pos += 2 + 2 * (-(-int(np.prod(shape)) // interval) - 1)
+        if len(metadata) != pos:
+            raise ValueError("Tree-walk decoder does not support transform headers")
+    root = tree_from_codes(_canonical_codes(lengths), lengths)
+
+    bit_string = ''.join(format(b, '08b') for b in data)
+    if padding > 0:
+        bit_string = bit_string[:-padding]
+
+    decoded = []
+    node = root
+    total_pixels = np.prod(shape)
+    for bit in bit_string:
+        node = node.left if bit == '0' else node.right
+        if node.val is not None:
+            decoded.append(node.val)
+            node = root
+            if len(decoded) == total_pixels:
+                break
+    return np.array(decoded, dtype=np.uint8).reshape(shape)
+
+
+def sample_images(size, seed: int = 0) -> dict:
+    """Ảnh thử tổng hợp; size là cạnh ảnh vuông hoặc (cao, rộng)."""
+    h, w = (size, size) if isinstance(size, int) else size
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:h, 0:w]
+    base = np.sin(x / 40) * 60 + np.cos(y / 30) * 50 + 128
+    photo = np.stack([base + rng.normal(0, 6, x.shape),
+                      base * 0.8 + rng.normal(0, 4, x.shape) + 20,
+                      base * 0.5 + 60], axis=-1)
+    flat = np.zeros((h, w, 3))
+    flat[h // 5:h // 2, w // 4:w // 2] = (200, 30, 30)
+    flat[h * 2 // 3:] = (10, 200, 90)
+    return {
+        "photo": photo.clip(0, 255).astype(np.uint8),
+        "gradient": ((x + y) // 3 % 256)[..., None].repeat(3, axis=-1).astype(np.uint8),
+        "flat": flat.astype(np.uint8),
+        "noise": rng.integers(0, 256, (h, w, 3), dtype=np.uint8),
+        "levels": (rng.integers(0, 8, (h, w, 3)) * 32).astype(np.uint8),
+        "noise7": rng.integers(0, 128, (h, w, 3), dtype=np.uint8),
+    }
+
+
+def best_time(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=512, help="cạnh ảnh thử (pixel)")
+    parser.add_argument("--repeat", type=int, default=3, help="số lần đo, lấy lần nhanh nhất")
+    args = parser.parse_args()
+
+    comp = HuffmanCompressor()
+    print(f"{'ảnh':<10}{'cây (MB/s)':>12}{'bảng (MB/s)':>13}{'nhanh hơn':>11}{'không chỉ mục (MB/s)':>22}")
+    for name, img in sample_images(args.size).items():
+        data, meta = comp.encode(img)
+        plain = meta[:1 + _LENGTHS_SIZE]
+        assert np.array_equal(comp.decode(data, meta, img.shape), img)
+        assert np.array_equal(comp.decode(data, plain, img.shape), img)
+        assert np.array_equal(tree_walk_decode(data, meta, img.shape), img)
+
+        mb = img.nbytes / 1e6
+        t_tree = best_time(lambda: tree_walk_decode(data, meta, img.shape), args.repeat)
+        t_table = best_time(lambda: comp.decode(data, meta, img.shape), args.repeat)
+        t_plain = best_time(lambda: comp.decode(data, plain, img.shape), args.repeat)
+        print(f"{name:<10}{mb / t_tree:>12.1f}{mb / t_table:>13.1f}{t_tree / t_table:>10.1f}x"
+              f"{mb / t_plain:>22.1f}")
+
+
+if __name__ == "__main__":
+    main()
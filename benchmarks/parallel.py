@@ -0,0 +1,50 @@
+# benchmarks/parallel.py
+"""Đo tốc độ nén/giải nén song song theo dải so với encode()/decode() tuần tự.
+
+Chạy: python -m benchmarks.parallel [--size 2048] [--workers 1 2 4 8] [--block-rows 256]
+Ảnh thử là ảnh "photo" của benchmarks.huffman_decode; tăng tốc tính so với encode()/decode()
+trên toàn ảnh.
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+
+from core import HuffmanCompressor, RLECompressor
+from benchmarks.huffman_decode import best_time, sample_images
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=2048, help="cạnh ảnh thử (pixel)")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}), help="số tiến trình cần đo")
+    parser.add_argument("--block-rows", type=int, default=256, help="số hàng mỗi dải")
+    parser.add_argument("--repeat", type=int, default=3, help="số lần đo, lấy lần nhanh nhất")
+    args = parser.parse_args()
+
+    img = sample_images(args.size)["photo"]
+    print(f"ảnh {img.shape}, {img.nbytes / 1e6:.1f} MB, dải {args.block_rows} hàng")
+    print(f"{'codec':<20}{'workers':>8}{'nén (s)':>10}{'x':>7}{'giải nén (s)':>14}{'x':>7}")
+
+    # File container đo nằm trong thư mục tạm, bị xóa khi đo xong kể cả khi lỗi
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "bench.imgb")
+        for comp in (HuffmanCompressor(), HuffmanCompressor(shared_table=True), RLECompressor()):
+            label = comp.name + (" (bảng chung)" if getattr(comp, "shared_table", False) else "")
+            data, meta = comp.encode(img)
+            t_enc = best_time(lambda: comp.encode(img), args.repeat)
+            t_dec = best_time(lambda: comp.decode(data, meta, img.shape), args.repeat)
+            print(f"{label:<20}{'serial':>8}{t_enc:>10.3f}{1:>6.1f}x{t_dec:>14.3f}{1:>6.1f}x")
+
+            for workers in args.workers:
+                t_save = best_time(lambda: comp.save_stream(path, img, args.block_rows, workers=workers), args.repeat)
+                assert np.array_equal(comp.load_image(path, workers), img)
+                t_load = best_time(lambda: comp.load_image(path, workers), args.repeat)
+                print(f"{label:<20}{workers:>8}{t_save:>10.3f}{t_enc / t_save:>6.1f}x"
+                      f"{t_load:>14.3f}{t_dec / t_load:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
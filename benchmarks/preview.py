@@ -0,0 +1,51 @@
+# benchmarks/preview.py
+"""Đo các phần của GUI chạy được khi không có màn hình: thu nhỏ ảnh xem trước và thời gian import.
+
+Chạy: python -m benchmarks.preview [--sizes 1024 4k 20mp] [--repeat 3]
+Thời gian import đo trong tiến trình Python mới (khởi động nguội); các module này được giao
+diện nạp khi dùng lần đầu thay vì lúc mở cửa sổ.
+"""
+import argparse
+import subprocess
+import sys
+
+import numpy as np
+
+from benchmarks.huffman_decode import best_time
+from gui.preview import PREVIEW_SIZE, downsample
+
+SIZES = {"1024": (1024, 1024), "4k": (2160, 3840), "20mp": (3648, 5472)}
+IMPORTS = ("numpy", "PIL.Image", "core", "matplotlib.pyplot")
+
+
+def import_time(module: str):
+    """Giây để import module trong tiến trình mới, None nếu chưa cài."""
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    return float(out.stdout) if out.returncode == 0 else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", default=list(SIZES), choices=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=3, help="số lần đo, lấy lần nhanh nhất")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'ảnh':<8}{'xem trước':>12}{'area (ms)':>12}{'stride (ms)':>13}")
+    for name in args.sizes:
+        h, w = SIZES[name]
+        img = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+        shape = downsample(img, PREVIEW_SIZE, "stride").shape
+        t_area = best_time(lambda: downsample(img, PREVIEW_SIZE, "area"), args.repeat)
+        t_stride = best_time(lambda: downsample(img, PREVIEW_SIZE, "stride"), args.repeat)
+        print(f"{name:<8}{f'{shape[1]}x{shape[0]}':>12}{t_area * 1e3:>12.1f}{t_stride * 1e3:>13.2f}")
+
+    print()
+    for module in IMPORTS:
+        t = import_time(module)
+        print(f"import {module:<20}{'chưa cài' if t is None else f'{t * 1e3:.0f} ms':>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+# benchmarks/rans.py
+"""So sánh kích thước và thông lượng của rANS (order 0 và 1) với Huffman trên cùng ảnh.
+
+Chạy: python -m benchmarks.rans [--size 512] [--repeat 3] [-t ycocg+planar+up]
+Tỉ lệ = (dữ liệu + metadata) / kích thước ảnh gốc; thông lượng tính theo MB ảnh gốc mỗi giây.
+"""
+import argparse
+
+import numpy as np
+
+from core import HuffmanCompressor, RANSCompressor
+from benchmarks.huffman_decode import best_time, sample_images
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=512, help="cạnh ảnh thử (pixel)")
+    parser.add_argument("--repeat", type=int, default=3, help="số lần đo, lấy lần nhanh nhất")
+    parser.add_argument("-t", "--transform", help="biến đổi trước khi nén, ví dụ ycocg+planar+up")
+    args = parser.parse_args()
+
+    codecs = {"huffman": HuffmanCompressor(transform=args.transform),
+              "rans-o0": RANSCompressor(order=0, transform=args.transform),
+              "rans-o1": RANSCompressor(order=1, transform=args.transform)}
+    print(f"{'ảnh':<10}{'codec':<10}{'tỉ lệ':>8}{'nén (MB/s)':>12}{'giải nén (MB/s)':>17}")
+    for name, img in sample_images(args.size).items():
+        mb = img.nbytes / 1e6
+        for codec, comp in codecs.items():
+            data, meta = comp.encode(img)
+            assert np.array_equal(comp.decode(data, meta, img.shape), img)
+            t_enc = best_time(lambda: comp.encode(img), args.repeat)
+            t_dec = best_time(lambda: comp.decode(data, meta, img.shape), args.repeat)
+            ratio = (len(data) + len(meta)) / img.nbytes
+            print(f"{name:<10}{codec:<10}{ratio:>8.4f}{mb / t_enc:>12.1f}{mb / t_dec:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# benchmarks/suite.py
+"""Bộ benchmark lặp lại được cho các codec trên nhiều loại ảnh và kích thước.
+
+Chạy:   python -m benchmarks.suite run [--sizes 256 1024 4k 8k] [--repeat 3] [-o results.json]
+So sánh: python -m benchmarks.suite compare cũ.json mới.json [--threshold 0.1]
+
+Với mỗi codec x loại ảnh (photo, gradient, flat, noise, levels, noise7) x kích thước đo: thông lượng nén/giải nén
+(lần nhanh nhất trong --repeat lần), thời gian ghi/đọc file, bộ nhớ đỉnh (tracemalloc, đo riêng
+một lần vì tracemalloc làm chậm chương trình), kích thước dữ liệu nén và phần header/metadata
+của file. Kết quả ghi ra file JSON; lệnh compare báo các chỉ số xấu đi quá ngưỡng và trả mã
+thoát 1 nếu có. Với hybrid, "levels" và "noise7" (nhiễu 7 bit) cho các ô Huffman có mã
+không tự đồng bộ, nên đo được tốc độ giải mã các ô đó.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+from core import HuffmanCompressor, HybridCompressor, RANSCompressor, RLECompressor, VarRLECompressor
+from benchmarks.huffman_decode import best_time, sample_images
+
+CODECS = {"rle": (RLECompressor, ".rle"), "huffman": (HuffmanCompressor, ".huff"), "hybrid": (HybridCompressor, ".hyb"),
+          "rlev": (VarRLECompressor, ".rlev"), "rans": (RANSCompressor, ".rans")}
+# Tên kích thước chuẩn -> (cao, rộng)
+NAMED_SIZES = {"hd": (720, 1280), "fhd": (1080, 1920), "4k": (2160, 3840), "8k": (4320, 7680)}
+# Chỉ số -> hướng tốt hơn (+1: càng lớn càng tốt, -1: càng nhỏ càng tốt)
+METRICS = {"encode_mb_s": 1, "decode_mb_s": 1, "save_mb_s": 1, "load_mb_s": 1,
+           "encode_peak_mb": -1, "decode_peak_mb": -1, "file_bytes": -1}
+
+
+def parse_size(text: str) -> tuple[int, int]:
+    if text.lower() in NAMED_SIZES:
+        return NAMED_SIZES[text.lower()]
+    if "x" in text:
+        h, w = text.lower().split("x")
+        return int(h), int(w)
+    return int(text), int(text)
+
+
+def peak_mb(fn) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def bench_one(comp, ext: str, img: np.ndarray, repeat: int, tmpdir: str) -> dict:
+    path = os.path.join(tmpdir, "bench" + ext)
+    data, meta = comp.encode(img)
+    if not np.array_equal(comp.decode(data, meta, img.shape), img):
+        raise AssertionError(f"{comp.name} round trip failed")
+    comp.save_file(path, data, meta, img.shape)
+    file_bytes = os.path.getsize(path)
+
+    mb = img.nbytes / 1e6
+    t_enc = best_time(lambda: comp.encode(img), repeat)
+    t_dec = best_time(lambda: comp.decode(data, meta, img.shape), repeat)
+    t_save = best_time(lambda: comp.save_file(path, data, meta, img.shape), repeat)
+    t_load = best_time(lambda: comp.load_file(path), repeat)
+    return {
+        "raw_bytes": img.nbytes,
+        "compressed_bytes": len(data),
+        "file_bytes": file_bytes,
+        "header_bytes": file_bytes - len(data),
+        "ratio": round(file_bytes / img.nbytes, 4),
+        "encode_mb_s": round(mb / t_enc, 2),
+        "decode_mb_s": round(mb / t_dec, 2),
+        "save_mb_s": round(mb / t_save, 2),
+        "load_mb_s": round(mb / t_load, 2),
+        "encode_peak_mb": round(peak_mb(lambda: comp.encode(img)), 2),
+        "decode_peak_mb": round(peak_mb(lambda: comp.decode(data, meta, img.shape)), 2),
+    }
+
+
+def run(args) -> int:
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in args.sizes:
+            h, w = parse_size(size)
+            for kind, img in sample_images((h, w), seed=args.seed).items():
+                for codec in args.codecs:
+                    cls, ext = CODECS[codec]
+                    row = {"codec": codec, "transform": args.transform, "image": kind, "size": f"{h}x{w}",
+                           **bench_one(cls(transform=args.transform), ext, img, args.repeat, tmpdir)}
+                    results.append(row)
+                    print(f"{codec:<8}{kind:<9}{row['size']:>10}  tỉ lệ {row['ratio']:<7}"
+                          f"nén {row['encode_mb_s']:>8} MB/s  giải nén {row['decode_mb_s']:>8} MB/s  "
+                          f"đỉnh {row['encode_peak_mb']:>7}/{row['decode_peak_mb']:<7} MB", flush=True)
+    report = {
+        "meta": {"date": datetime.datetime.now().isoformat(timespec="seconds"),
+                 "python": sys.version.split()[0], "numpy": np.__version__,
+                 "platform": platform.platform(), "cpu_count": os.cpu_count(),
+                 "repeat": args.repeat, "seed": args.seed},
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1, ensure_ascii=False)
+    print(f"Đã ghi {args.output}")
+    return 0
+
+
+def _key(row: dict) -> tuple:
+    return row["codec"], row.get("transform") or "-", row["image"], row["size"]
+
+
+def compare(args) -> int:
+    with open(args.old, encoding="utf-8") as f:
+        old = {_key(r): r for r in json.load(f)["results"]}
+    with open(args.new, encoding="utf-8") as f:
+        new = {_key(r): r for r in json.load(f)["results"]}
+
+    regressions = 0
+    for key in sorted(old.keys() & new.keys()):
+        changes = []
+        for metric, better in METRICS.items():
+            a, b = old[key].get(metric), new[key].get(metric)
+            if not a or b is None:
+                continue
+            delta = (b - a) / a
+            flag = ""
+            if delta * better < -args.threshold:
+                flag, regressions = " !", regressions + 1
+            elif delta * better > args.threshold:
+                flag = " +"
+            changes.append(f"{metric} {delta:+.0%}{flag}")
+        print(f"{' '.join(key):<36}" + ", ".join(changes))
+    for key in sorted(old.keys() ^ new.keys()):
+        print(f"{' '.join(key):<36}chỉ có trong {'cũ' if key in old else 'mới'}")
+    print(f"{regressions} chỉ số xấu đi quá {args.threshold:.0%}" if regressions
+          else "Không có chỉ số nào xấu đi quá ngưỡng")
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run", help="chạy benchmark và ghi file kết quả")
+    p.add_argument("--sizes", nargs="+", default=["256", "1024", "2048"],
+                   help="cạnh ảnh vuông, HxW hoặc tên chuẩn (hd, fhd, 4k, 8k)")
+    p.add_argument("--codecs", nargs="+", choices=sorted(CODECS), default=sorted(CODECS))
+    p.add_argument("--repeat", type=int, default=3, help="số lần đo, lấy lần nhanh nhất")
+    p.add_argument("--seed", type=int, default=0, help="seed của ảnh thử")
+    p.add_argument("-t", "--transform", help="biến đổi trước khi nén, ví dụ ycocg+planar+adaptive")
+    p.add_argument("-o", "--output", default="benchmark_results.json", help="file kết quả JSON")
+
+    p = sub.add_parser("compare", help="so sánh hai file kết quả")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.add_argument("--threshold", type=float, default=0.1, help="ngưỡng thay đổi tương đối bị coi là xấu đi")
+
+    args = parser.parse_args()
+    return run(args) if args.command == "run" else compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
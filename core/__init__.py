@@ -4,14 +4,28 @@ Gói core chứa các thuật toán nén ảnh lossless
 """
 
 from .compressor import Compressor
-from .rle import RLECompressor
+from .rle import RLECompressor, VarRLECompressor
 from .huffman import HuffmanCompressor
+from .hybrid import HybridCompressor
+from .rans import RANSCompressor
+from .dictionary import HuffmanDictionary
+from .filters import Transform
+from .container import ContainerReader, ContainerWriter
+from .cache import DecodeCache
 from .utils import calculate_mse_psnr, format_bytes
 
 __all__ = [
     "Compressor",
     "RLECompressor",
+    "VarRLECompressor",
     "HuffmanCompressor",
+    "HybridCompressor",
+    "RANSCompressor",
+    "HuffmanDictionary",
+    "Transform",
+    "ContainerReader",
+    "ContainerWriter",
+    "DecodeCache",
     "calculate_mse_psnr",
     "format_bytes"
 ]
\ No newline at end of file
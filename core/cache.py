@@ -0,0 +1,74 @@
+# core/cache.py
+"""
+Bộ nhớ đệm ảnh đã giải nén, tránh giải nén lại cùng một dữ liệu nén nhiều lần
+(hiển thị, kiểm tra lossless, xuất PNG...).
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Giới hạn bộ nhớ mặc định của cache (byte)
+DEFAULT_BUDGET = 512 * 1024 * 1024
+
+
+class DecodeCache:
+    """
+    Cache LRU theo khóa (tên thuật toán, hash dữ liệu nén và metadata, shape), giới hạn tổng
+    số byte ảnh. An toàn khi dùng từ nhiều luồng; ảnh trả về là mảng chỉ đọc dùng chung.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_BUDGET):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(method: str, data, metadata, shape: tuple) -> tuple:
+        digest = hashlib.blake2b(data, digest_size=16)
+        # Metadata (bảng mã, header transform) cũng quyết định ảnh giải nén
+        if isinstance(metadata, (bytes, bytearray, memoryview)):
+            digest.update(metadata)
+        return method, digest.digest(), tuple(shape)
+
+    def get(self, key: tuple):
+        with self._lock:
+            img = self._items.get(key)
+            if img is not None:
+                self._items.move_to_end(key)
+            return img
+
+    def put(self, key: tuple, img: np.ndarray) -> np.ndarray:
+        img.flags.writeable = False
+        if img.nbytes > self.max_bytes:
+            return img
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self._items[key] = img
+            self.nbytes += img.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+        return img
+
+    def decode(self, compressor, data, metadata, shape: tuple, progress=None) -> np.ndarray:
+        """compressor.decode() qua cache: lần đầu giải nén và lưu lại, các lần sau trả ngay."""
+        key = self.key(compressor.name, data, metadata, shape)
+        img = self.get(key)
+        if img is None:
+            img = self.put(key, compressor.decode(data, metadata, shape, progress=progress))
+        elif progress:
+            progress(img.nbytes, img.nbytes)
+        return img
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
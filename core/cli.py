@@ -0,0 +1,314 @@
+# core/cli.py
+"""
+Giao diện dòng lệnh không cần GUI (không import Tk): nén/giải nén/đo tốc độ cả file lẫn thư mục.
+
+    python -m core compress   ảnh.png thư_mục/ -o output/ -m rle huffman -j 4
+    python -m core decompress output/ -o restored/
+    python -m core bench      ảnh.png -m huffman --repeat 3 -t ycocg+planar+paeth
+    python -m core inspect    output/
+    python -m core train-dict mẫu/ -o scans.hdict -t ycocg+planar+up
+    python -m core compress   scans/ -m huffman --dict scans.hdict -t ycocg+planar+up
+    python -m core verify     output/
+
+Mỗi file xử lý xong in ra một dòng JSON (kích thước, tỉ lệ nén, thông lượng, PSNR) ngay khi có
+kết quả. Ảnh đọc bằng Pillow; file .npy (mảng uint8 h x w x c) đọc bằng NumPy.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from .compressor import _ordered_map
+from .container import ContainerReader
+from .dictionary import HuffmanDictionary
+from .fileformat import inspect, verify
+from .filters import Transform
+from .huffman import HuffmanCompressor
+from .metrics import is_lossless
+from .hybrid import HybridCompressor
+from .rans import RANSCompressor
+from .rle import RLECompressor, VarRLECompressor
+from .utils import calculate_mse_psnr, format_bytes
+
+COMPRESSORS = {"rle": RLECompressor, "huffman": HuffmanCompressor, "hybrid": HybridCompressor,
+               "rlev": VarRLECompressor, "rans": RANSCompressor}
+EXTENSIONS = {"rle": ".rle", "huffman": ".huff", "hybrid": ".hyb", "rlev": ".rlev", "rans": ".rans"}
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp", ".npy"}
+COMPRESSED_EXTENSIONS = {".rle", ".rlev", ".huff", ".hyb", ".rans", ".imgb"}
+
+
+def collect_files(inputs: list, extensions: set, relative: bool = False) -> list:
+    """
+    Danh sách file từ các đường dẫn file/thư mục (thư mục được duyệt đệ quy, lọc theo đuôi).
+    relative=True: trả về cặp (đường dẫn, tên tương đối so với thư mục chung của mọi đầu vào)
+    để thư mục ra giữ cấu trúc thư mục con, ví dụ a/img.png và b/img.png không trùng tên.
+    """
+    files = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files += [os.path.join(root, n) for n in sorted(names)
+                          if os.path.splitext(n)[1].lower() in extensions]
+        else:
+            files.append(path)
+    if not relative:
+        return files
+    roots = [os.path.abspath(p) if os.path.isdir(p) else os.path.dirname(os.path.abspath(p)) for p in inputs]
+    try:
+        common = os.path.commonpath(roots) if roots else ""
+    except ValueError:
+        # Đầu vào nằm trên các ổ đĩa khác nhau (Windows): chỉ giữ tên file
+        return [(f, os.path.basename(f)) for f in files]
+    return [(f, os.path.relpath(os.path.abspath(f), common)) for f in files]
+
+
+def read_image(path: str) -> np.ndarray:
+    if path.lower().endswith(".npy"):
+        img = np.load(path)
+    else:
+        from PIL import Image
+        with Image.open(path) as im:
+            img = np.array(im.convert("RGB"), dtype=np.uint8)
+    if img.dtype != np.uint8 or img.ndim != 3:
+        raise ValueError(f"Expected a uint8 h x w x c image, got {img.dtype} {img.shape}")
+    return img
+
+
+def write_image(path: str, img: np.ndarray):
+    if path.lower().endswith(".npy"):
+        np.save(path, img)
+    else:
+        from PIL import Image
+        Image.fromarray(img).save(path)
+
+
+def _psnr(orig: np.ndarray, rec: np.ndarray) -> dict:
+    if is_lossless(orig, rec):
+        return {"mse": 0.0, "psnr": None, "lossless": True}
+    mse, psnr = calculate_mse_psnr(orig, rec)
+    # JSON không có Infinity: ảnh khôi phục hoàn hảo ghi psnr = null, lossless = true
+    return {"mse": float(mse), "psnr": None if mse == 0 else float(psnr), "lossless": bool(mse == 0)}
+
+
+def compressed_path(out_dir: str, name: str, method: str, block_rows: int = None) -> str:
+    """File nén ghi ra cho ảnh có tên tương đối `name` (xem collect_files)."""
+    suffix = EXTENSIONS[method] + (".imgb" if block_rows else "")
+    return os.path.join(out_dir, os.path.splitext(name)[0] + suffix)
+
+
+def decompressed_path(out_dir: str, name: str, fmt: str) -> str:
+    # Giữ cả đuôi gốc để a.rle và a.huff không ghi đè lên nhau
+    return os.path.join(out_dir, f"{name}.{fmt}")
+
+
+def find_collision(outputs: list) -> str:
+    """Thông báo lỗi nếu hai cặp (đầu vào, file ghi ra) ghi cùng một file, None nếu không có.
+
+    Ví dụ a.png và a.bmp cùng nén thành a.huff: nếu không chặn trước, file sau ghi đè file trước
+    (hoặc tranh nhau khi chạy -j) mà cả hai vẫn báo lossless.
+    """
+    seen = {}
+    for src, out in outputs:
+        key = os.path.normcase(os.path.abspath(out))
+        if key in seen:
+            return f"{seen[key]} and {src} would both write {out}"
+        seen[key] = src
+    return None
+
+
+def _compressor(method: str, transform: str = None, dictionary: str = None):
+    """Tạo compressor; từ điển (--dict) chỉ áp dụng cho Huffman."""
+    if dictionary and method == "huffman":
+        return HuffmanCompressor(transform=transform, dictionary=HuffmanDictionary.load(dictionary))
+    return COMPRESSORS[method](transform=transform)
+
+
+def compress_file(path: str, method: str, out_dir: str, block_rows: int = None, transform: str = None,
+                  dictionary: str = None, name: str = None) -> dict:
+    """name: tên tương đối của ảnh trong thư mục ra (mặc định tên file)."""
+    comp = _compressor(method, transform, dictionary)
+    img = read_image(path)
+    out = compressed_path(out_dir, name or os.path.basename(path), method, block_rows)
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    start = time.perf_counter()
+    if block_rows:
+        comp.save_stream(out, img, block_rows)
+        elapsed = time.perf_counter() - start
+        rec = comp.load_image(out)
+    else:
+        data, meta = comp.encode(img)
+        comp.save_file(out, data, meta, img.shape)
+        elapsed = time.perf_counter() - start
+        rec = comp.decode(data, meta, img.shape)
+    size = os.path.getsize(out)
+    return {"file": path, "method": comp.name, "transform": transform, "output": out, "raw_bytes": img.nbytes,
+            "file_bytes": size, "size": format_bytes(size), "ratio": round(size / img.nbytes, 4),
+            "seconds": round(elapsed, 4), "mb_per_s": round(img.nbytes / 1e6 / max(elapsed, 1e-9), 2),
+            **_psnr(img, rec)}
+
+
+def decompress_file(path: str, out_dir: str, fmt: str, dictionary: str = None, name: str = None) -> dict:
+    """name: tên tương đối của file nén trong thư mục ra (mặc định tên file)."""
+    ext = os.path.splitext(path)[1].lower()
+    start = time.perf_counter()
+    if ext == ".imgb":
+        with ContainerReader(path) as reader:
+            codec = reader.codec
+        comp = next((_compressor(m, dictionary=dictionary) for m, c in COMPRESSORS.items()
+                     if c().name == codec), None)
+        if comp is None:
+            raise ValueError(f"Unknown codec in container: {codec}")
+        img = comp.load_image(path)
+    else:
+        comp = next((_compressor(m, dictionary=dictionary) for m, e in EXTENSIONS.items() if e == ext), None)
+        if comp is None:
+            raise ValueError(f"Unknown compressed file type: {ext or path}")
+        img = comp.load_file(path)
+    elapsed = time.perf_counter() - start
+    out = decompressed_path(out_dir, name or os.path.basename(path), fmt)
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    write_image(out, img)
+    return {"file": path, "method": comp.name, "output": out, "file_bytes": os.path.getsize(path),
+            "raw_bytes": img.nbytes, "shape": list(img.shape), "seconds": round(elapsed, 4),
+            "mb_per_s": round(img.nbytes / 1e6 / max(elapsed, 1e-9), 2)}
+
+
+def bench_file(path: str, method: str, repeat: int, transform: str = None, profile: bool = False,
+               dictionary: str = None) -> dict:
+    comp = _compressor(method, transform, dictionary)
+    img = read_image(path)
+    t_enc = t_dec = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data, meta = comp.encode(img)
+        t_enc = min(t_enc, time.perf_counter() - start)
+        start = time.perf_counter()
+        rec = comp.decode(data, meta, img.shape)
+        t_dec = min(t_dec, time.perf_counter() - start)
+    mb = img.nbytes / 1e6
+    stages = {}
+    if profile:
+        # Thêm một lượt đo riêng: thời gian từng giai đoạn và bộ nhớ đỉnh
+        (data, meta), enc = comp.profile("encode", img, memory=True)
+        _, dec = comp.profile("decode", data, meta, img.shape, memory=True)
+        stages = {"encode_profile": enc.to_dict(), "decode_profile": dec.to_dict()}
+    return {"file": path, "method": comp.name, "transform": transform, "raw_bytes": img.nbytes,
+            "compressed_bytes": len(data), "file_bytes": comp.file_size(data, meta),
+            "size": format_bytes(len(data)), "ratio": round(len(data) / img.nbytes, 4),
+            "encode_s": round(t_enc, 4), "decode_s": round(t_dec, 4),
+            "encode_mb_per_s": round(mb / max(t_enc, 1e-9), 2),
+            "decode_mb_per_s": round(mb / max(t_dec, 1e-9), 2), **_psnr(img, rec), **stages}
+
+
+def train_dictionary(output: str, files: list, transform: str = None) -> dict:
+    """Huấn luyện từ điển Huffman từ các ảnh mẫu (đọc lần lượt) và ghi ra file."""
+    start = time.perf_counter()
+    d = HuffmanDictionary.train((read_image(f) for f in files), transform=transform)
+    d.save(output)
+    return {"file": output, "id": f"{d.id:08x}", "samples": len(files), "transform": transform,
+            "seconds": round(time.perf_counter() - start, 4)}
+
+
+def _run(fn, *args):
+    """Bọc một job để lỗi của một file thành dòng JSON thay vì dừng cả lô."""
+    try:
+        return fn(*args)
+    except Exception as e:
+        return {"file": args[0], "error": f"{type(e).__name__}: {e}"}
+
+
+def _transform_spec(text: str) -> str:
+    """Kiểm tra chuỗi --transform ngay khi parse để lỗi hiện một lần thay vì ở mọi file."""
+    try:
+        Transform.parse(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return text
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m core", description="Nén ảnh lossless RLE/Huffman không cần GUI")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def common(p, methods=True):
+        p.add_argument("inputs", nargs="+", help="file hoặc thư mục")
+        p.add_argument("-j", "--workers", type=int, default=1, help="số tiến trình song song (0 = số lõi CPU)")
+        if methods:
+            p.add_argument("-m", "--methods", nargs="+", choices=sorted(COMPRESSORS),
+                           default=sorted(COMPRESSORS), help="thuật toán nén")
+            p.add_argument("-t", "--transform", type=_transform_spec,
+                           help="biến đổi trước khi nén, ví dụ ycocg+planar+adaptive (xem core/filters.py)")
+
+    def dictionary(p):
+        p.add_argument("--dict", dest="dictionary", help="file từ điển Huffman (.hdict) tạo bằng train-dict")
+
+    p = sub.add_parser("compress", help="nén ảnh thành .rle/.rlev/.huff/.hyb/.rans")
+    common(p)
+    dictionary(p)
+    p.add_argument("-o", "--output", default="output", help="thư mục ghi file nén")
+    p.add_argument("--block-rows", type=int, help="ghi container .imgb chia dải bấy nhiêu hàng")
+
+    p = sub.add_parser("decompress", help="giải nén .rle/.rlev/.huff/.hyb/.rans/.imgb thành ảnh")
+    common(p, methods=False)
+    dictionary(p)
+    p.add_argument("-o", "--output", default="output", help="thư mục ghi ảnh giải nén")
+    p.add_argument("--format", choices=["png", "npy"], default="png", help="định dạng ảnh ghi ra")
+
+    p = sub.add_parser("bench", help="đo tốc độ nén/giải nén trong bộ nhớ, không ghi file")
+    common(p)
+    dictionary(p)
+    p.add_argument("--repeat", type=int, default=3, help="số lần đo, lấy lần nhanh nhất")
+    p.add_argument("--profile", action="store_true", help="thêm thời gian từng giai đoạn và bộ nhớ đỉnh")
+
+    p = sub.add_parser("inspect", help="đọc header: codec, kích thước ảnh, số khối, tỉ lệ nén (không giải nén)")
+    common(p, methods=False)
+
+    p = sub.add_parser("verify", help="kiểm tra checksum của file nén mà không giải nén")
+    common(p, methods=False)
+
+    p = sub.add_parser("train-dict", help="huấn luyện từ điển Huffman dùng chung từ các ảnh mẫu")
+    p.add_argument("inputs", nargs="+", help="file hoặc thư mục ảnh mẫu")
+    p.add_argument("-o", "--output", required=True, help="file từ điển ghi ra (.hdict)")
+    p.add_argument("-t", "--transform", type=_transform_spec,
+                   help="biến đổi trước khi nén (phải trùng với -t khi compress)")
+    return parser
+
+
+def main(argv: list = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "train-dict":
+        result = _run(train_dictionary, args.output, collect_files(args.inputs, IMAGE_EXTENSIONS), args.transform)
+        print(json.dumps(result, ensure_ascii=False), flush=True)
+        return 1 if "error" in result else 0
+    if args.command == "decompress":
+        files = collect_files(args.inputs, COMPRESSED_EXTENSIONS, relative=True)
+        jobs = [(decompress_file, f, args.output, args.format, args.dictionary, name) for f, name in files]
+        outputs = [(f, decompressed_path(args.output, name, args.format)) for f, name in files]
+    elif args.command in ("inspect", "verify"):
+        fn = inspect if args.command == "inspect" else verify
+        jobs = [(fn, f) for f in collect_files(args.inputs, COMPRESSED_EXTENSIONS)]
+    else:
+        files = collect_files(args.inputs, IMAGE_EXTENSIONS, relative=True)
+        if args.command == "compress":
+            jobs = [(compress_file, f, m, args.output, args.block_rows, args.transform, args.dictionary, name)
+                    for f, name in files for m in args.methods]
+            outputs = [(f, compressed_path(args.output, name, m, args.block_rows))
+                       for f, name in files for m in args.methods]
+        else:
+            jobs = [(bench_file, f, m, args.repeat, args.transform, args.profile, args.dictionary)
+                    for f, _ in files for m in args.methods]
+    if args.command in ("compress", "decompress"):
+        # Chặn trước khi chạy: hai đầu vào trùng file ra sẽ ghi đè nhau mà không báo lỗi
+        collision = find_collision(outputs)
+        if collision:
+            parser.error(f"output collision: {collision}")
+        os.makedirs(args.output, exist_ok=True)
+
+    failed = 0
+    for result in _ordered_map(_run, jobs, args.workers or None):
+        failed += "error" in result or result.get("ok") is False
+        print(json.dumps(result, ensure_ascii=False), flush=True)
+    return 1 if failed else 0
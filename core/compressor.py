@@ -1,16 +1,89 @@
 # core/compressor.py
+import os
 from abc import ABC, abstractmethod
-from typing import Tuple, Any
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Tuple, Any, Iterable, Iterator
 import numpy as np
 
+from .container import ContainerReader, ContainerWriter
+from .fileformat import file_size, pack_file
+from .filters import Transform, inverse
+from .profiling import profile, stage
+
+# Số hàng mặc định của mỗi dải khi nén theo luồng
+DEFAULT_BLOCK_ROWS = 256
+
+
+def _encode_block(compressor, strip: np.ndarray, params: dict):
+    data, metadata = compressor.encode(strip, **params)
+    return data, metadata, strip.shape
+
+
+def _decode_block(compressor, data: bytes, metadata: Any, shape: Tuple[int, ...]) -> np.ndarray:
+    return compressor.decode(data, metadata, shape)
+
+
+def _ordered_map(fn, jobs: Iterable[tuple], workers) -> Iterator:
+    """
+    Gọi fn(*job) cho từng job, trả kết quả đúng thứ tự. Với workers > 1 (None = số lõi CPU),
+    các job chạy trong ProcessPoolExecutor và chỉ tối đa 2 * workers job được gửi trước,
+    nên bộ nhớ vẫn giới hạn theo số khối đang xử lý.
+    """
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    if workers <= 1:
+        for job in jobs:
+            yield fn(*job)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for job in jobs:
+            pending.append(pool.submit(fn, *job))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
 class Compressor(ABC):
+    def __init__(self, transform=None):
+        # transform: biến đổi khả nghịch trước khi mã hóa (Transform hoặc chuỗi như
+        # "ycocg+planar+adaptive", xem core.filters); header của nó nằm trong metadata
+        self.transform = Transform.parse(transform)
+
+    def _forward(self, img: np.ndarray) -> Tuple[np.ndarray, bytes]:
+        """Áp dụng transform (nếu có), trả về (dữ liệu cần mã hóa, header của transform)."""
+        if self.transform is None:
+            return img, b''
+        with stage("transform"):
+            return self.transform.forward(img)
+
+    @staticmethod
+    def _inverse(flat: np.ndarray, shape: Tuple[int, ...], header) -> np.ndarray:
+        """Đảo ngược transform theo header lưu trong metadata (rỗng: không có transform)."""
+        if not header:
+            return flat.reshape(shape)
+        with stage("inverse_transform"):
+            return inverse(flat, shape, header)
+
+    def profile(self, operation: str, *args, memory: bool = False, cprofile: str = None, **kwargs):
+        """
+        Chạy self.<operation>(*args, **kwargs) (encode, decode, save_file, load_file...) trong
+        một phiên đo của core.profiling, trả về (kết quả, Stats) với thời gian từng giai đoạn.
+        """
+        return profile(getattr(self, operation), *args, memory=memory, cprofile=cprofile,
+                       operation=f"{self.name}.{operation}", **kwargs)
+
+    # Tham số progress của encode/decode: hàm progress(đã xử lý, tổng) tính theo số byte ảnh,
+    # được gọi định kỳ trong lúc chạy; exception raise từ progress sẽ hủy thao tác.
+
     @abstractmethod
-    def encode(self, img: np.ndarray) -> Tuple[bytes, Any]:
+    def encode(self, img: np.ndarray, progress=None) -> Tuple[bytes, Any]:
         """Trả về (dữ liệu nén, metadata)"""
         pass
 
     @abstractmethod
-    def decode(self, data: bytes, metadata: Any, shape: Tuple[int, ...]) -> np.ndarray:
+    def decode(self, data: bytes, metadata: Any, shape: Tuple[int, ...], progress=None) -> np.ndarray:
         pass
 
     @abstractmethod
@@ -21,7 +94,93 @@ class Compressor(ABC):
     def load_file(self, path: str) -> np.ndarray:
         pass
 
+    def to_bytes(self, data: bytes, metadata: Any, shape: Tuple[int, ...]) -> bytearray:
+        """Nội dung file save_file() sẽ ghi, tạo trong bộ nhớ; from_bytes() đọc lại được."""
+        return pack_file(self.name, shape, metadata, data)
+
+    def file_size(self, data: bytes, metadata: Any) -> int:
+        """Kích thước file save_file() sẽ ghi, tính từ độ dài mà không đóng gói hay ghi đĩa."""
+        return file_size(self.name, metadata, data)
+
     @property
     @abstractmethod
     def name(self) -> str:
-        pass
\ No newline at end of file
+        pass
+
+    def _blocks(self, img: np.ndarray, block_rows: int, block_cols: int) -> Iterator[np.ndarray]:
+        """Các khối block_rows x block_cols của img theo thứ tự hàng trước."""
+        for y in range(0, img.shape[0], block_rows):
+            for x in range(0, img.shape[1], block_cols):
+                yield np.ascontiguousarray(img[y:y + block_rows, x:x + block_cols])
+
+    def _stream_params(self, img: np.ndarray, block_rows: int, block_cols: int) -> dict:
+        """Tham số bổ sung truyền cho encode() của mọi khối (ví dụ bảng mã dùng chung)."""
+        return {}
+
+    def encode_stream(self, img: np.ndarray, block_rows: int = DEFAULT_BLOCK_ROWS,
+                      block_cols: int = None,
+                      workers: int = 1) -> Iterator[Tuple[bytes, Any, Tuple[int, ...]]]:
+        """
+        Nén lần lượt từng khối block_rows x block_cols (mặc định là cả dải hàng ngang), theo
+        thứ tự hàng trước; sinh (dữ liệu nén, metadata, shape) của mỗi khối.
+        img có thể là np.memmap: mỗi lần chỉ vài khối được đọc vào bộ nhớ.
+        workers > 1 nén các khối song song trên nhiều tiến trình (None = số lõi CPU).
+        """
+        block_cols = block_cols or img.shape[1]
+        if block_rows < 1 or block_cols < 1:
+            raise ValueError("block_rows and block_cols must be positive")
+        params = self._stream_params(img, block_rows, block_cols)
+        jobs = ((self, block, params) for block in self._blocks(img, block_rows, block_cols))
+        yield from _ordered_map(_encode_block, jobs, workers)
+
+    def decode_stream(self, blocks: Iterable[Tuple[bytes, Any, Tuple[int, ...]]],
+                      workers: int = 1) -> Iterator[np.ndarray]:
+        """Giải nén lần lượt từng khối (dữ liệu nén, metadata, shape), song song nếu workers > 1."""
+        jobs = ((self, data, metadata, shape) for data, metadata, shape in blocks)
+        yield from _ordered_map(_decode_block, jobs, workers)
+
+    def save_stream(self, path: str, img: np.ndarray, block_rows: int = DEFAULT_BLOCK_ROWS,
+                    block_cols: int = None, workers: int = 1):
+        """
+        Nén ảnh theo khối và ghi thẳng ra file container, không giữ toàn bộ dữ liệu nén.
+        Đặt block_cols để chia ô, cho phép decode_region() chỉ giải nén phần cần xem.
+        """
+        block_shape = (block_rows, block_cols or img.shape[1])
+        with ContainerWriter(path, self.name, img.shape, block_shape) as writer:
+            for data, metadata, _ in self.encode_stream(img, *block_shape, workers=workers):
+                writer.write_block(data, metadata)
+
+    def _open_container(self, path: str) -> ContainerReader:
+        reader = ContainerReader(path)
+        if reader.codec != self.name:
+            reader.close()
+            raise ValueError(f"Container was written by {reader.codec}, not {self.name}")
+        return reader
+
+    def load_stream(self, path: str, workers: int = 1) -> Iterator[np.ndarray]:
+        """Sinh lần lượt các khối ảnh đã giải nén từ file container (thứ tự hàng trước)."""
+        with self._open_container(path) as reader:
+            yield from self.decode_stream(reader.iter_blocks(), workers)
+
+    def load_image(self, path: str, workers: int = 1) -> np.ndarray:
+        """Giải nén toàn bộ file container vào một mảng (các khối giải nén song song nếu workers > 1)."""
+        with self._open_container(path) as reader:
+            h, w, _ = reader.shape
+            return self.decode_region(path, 0, h, 0, w, workers)
+
+    def decode_region(self, path: str, y0: int, y1: int, x0: int, x1: int,
+                      workers: int = 1) -> np.ndarray:
+        """Giải nén vùng [y0, y1) x [x0, x1) của file container, chỉ đọc các khối giao với vùng."""
+        with self._open_container(path) as reader:
+            h, w, c = reader.shape
+            if not (0 <= y0 < y1 <= h and 0 <= x0 < x1 <= w):
+                raise ValueError(f"Region [{y0}:{y1}, {x0}:{x1}] is outside image {h}x{w}")
+            out = np.empty((y1 - y0, x1 - x0, c), dtype=np.uint8)
+            indices = reader.blocks_in_region(y0, y1, x0, x1)
+            tiles = self.decode_stream((reader.read_block(i) for i in indices), workers)
+            for i, tile in zip(indices, tiles):
+                by0, by1, bx0, bx1 = reader.block_bounds(i)
+                ty0, ty1 = max(by0, y0), min(by1, y1)
+                tx0, tx1 = max(bx0, x0), min(bx1, x1)
+                out[ty0 - y0:ty1 - y0, tx0 - x0:tx1 - x0] = tile[ty0 - by0:ty1 - by0, tx0 - bx0:tx1 - bx0]
+            return out
@@ -0,0 +1,190 @@
+# core/container.py
+"""
+Định dạng container chia khối cho ảnh lớn: mỗi khối (mặc định là một dải hàng ngang)
+hoặc ô (tile) được nén độc lập nên có thể ghi/đọc lần lượt với bộ nhớ giới hạn, và nhờ index
+ở cuối file có thể giải nén riêng các ô giao với một vùng ảnh.
+
+Bố cục file:
+    header : b'IMGB' | version (1B) | len(codec) (1B) | codec (ascii) | h, w, c | block_h, block_w
+             | crc32 của mọi byte header đứng trước
+    khối   : meta_len (uint32) | metadata | data            (nối tiếp nhau)
+    index  : offset (uint64), length (uint32), crc32 (uint32) của từng khối
+    footer : index_offset (uint64) | block_count (uint32) | b'IMGB'
+crc32 trong index tính trên toàn bộ bản ghi của khối (meta_len + metadata + data). Container
+phiên bản 2 không có crc32 của header, phiên bản 1 không có cả crc32 trong index. Mọi số nguyên là little-endian. Khối xếp theo thứ tự hàng trước
+trên lưới block_h x block_w (block_w = w: các dải hàng ngang; block_w < w: các ô).
+"""
+import mmap
+import struct
+import zlib
+
+from .profiling import count
+
+_MAGIC = b'IMGB'
+_VERSION = 3
+_INDEX_ENTRY = struct.Struct('<QII')
+_INDEX_ENTRY_V1 = struct.Struct('<QI')
+_FOOTER = struct.Struct('<QI4s')
+
+
+def block_grid(shape: tuple, block_shape: tuple) -> tuple[int, int]:
+    """Số khối theo chiều dọc và chiều ngang."""
+    h, w = shape[:2]
+    bh, bw = block_shape
+    return -(-h // bh), -(-w // bw)
+
+
+def block_bounds(shape: tuple, block_shape: tuple, index: int) -> tuple[int, int, int, int]:
+    """(y0, y1, x0, x1) của khối thứ `index`."""
+    h, w = shape[:2]
+    bh, bw = block_shape
+    cols = block_grid(shape, block_shape)[1]
+    y0, x0 = (index // cols) * bh, (index % cols) * bw
+    return y0, min(y0 + bh, h), x0, min(x0 + bw, w)
+
+
+class ContainerWriter:
+    """Ghi container theo luồng: header trước, từng khối khi có, index khi đóng file."""
+
+    def __init__(self, path: str, codec: str, shape: tuple, block_shape: tuple):
+        self.shape = tuple(shape)
+        self.block_shape = tuple(block_shape)
+        self._index = []
+        self._f = open(path, 'wb')
+        name = codec.encode('ascii')
+        h, w, c = self.shape
+        header = (_MAGIC + struct.pack('<BB', _VERSION, len(name)) + name
+                  + struct.pack('<IIIII', h, w, c, *self.block_shape))
+        self._f.write(header)
+        self._f.write(struct.pack('<I', zlib.crc32(header)))
+
+    def write_block(self, data: bytes, metadata):
+        metadata = metadata or b''
+        offset = self._f.tell()
+        head = struct.pack('<I', len(metadata))
+        self._f.write(head)
+        self._f.write(metadata)
+        self._f.write(data)
+        length = self._f.tell() - offset
+        self._index.append((offset, length, zlib.crc32(data, zlib.crc32(metadata, zlib.crc32(head)))))
+        count("bytes_written", length)
+
+    def close(self):
+        if self._f.closed:
+            return
+        index_offset = self._f.tell()
+        for entry in self._index:
+            self._f.write(_INDEX_ENTRY.pack(*entry))
+        self._f.write(_FOOTER.pack(index_offset, len(self._index), _MAGIC))
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ContainerReader:
+    """
+    Đọc header và index của container qua mmap; dữ liệu của một khối chỉ được chép ra khi
+    read_block() được gọi, nên đọc vài ô chỉ chạm tới các trang file chứa các ô đó.
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            if f.read(4) != _MAGIC:
+                raise ValueError("Invalid container file")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_header()
+        except Exception:
+            self._mm.close()
+            raise
+
+    def _read_header(self):
+        mm = self._mm
+        if len(mm) < 4 + 2 + 20 + _FOOTER.size:
+            raise ValueError("Incomplete container file: missing header")
+        version, name_len = struct.unpack_from('<BB', mm, 4)
+        if version not in (1, 2, _VERSION):
+            raise ValueError(f"Unsupported container version: {version}")
+        self.version = version
+        end = 6 + name_len + 20
+        if len(mm) < end + (4 if version >= 3 else 0) + _FOOTER.size:
+            raise ValueError("Incomplete container file: missing header")
+        if version >= 3 and zlib.crc32(mm[:end]) != struct.unpack_from('<I', mm, end)[0]:
+            raise ValueError("Checksum mismatch: container header is corrupted")
+        self.codec = mm[6:6 + name_len].decode('ascii')
+        h, w, c, bh, bw = struct.unpack_from('<IIIII', mm, 6 + name_len)
+        self.shape = (h, w, c)
+        self.block_shape = (bh, bw)
+
+        index_offset, blocks, magic = _FOOTER.unpack_from(mm, len(mm) - _FOOTER.size)
+        if magic != _MAGIC:
+            raise ValueError("Incomplete container file: missing index")
+        entry = _INDEX_ENTRY if version >= 2 else _INDEX_ENTRY_V1
+        if index_offset + blocks * entry.size > len(mm) - _FOOTER.size:
+            raise ValueError("Incomplete container file: truncated index")
+        entries = [entry.unpack_from(mm, index_offset + i * entry.size) for i in range(blocks)]
+        self.index = [e[:2] for e in entries]
+        # crc32 của từng khối (None với container phiên bản 1)
+        self.crcs = [e[2] for e in entries] if version >= 2 else None
+
+        rows, cols = block_grid(self.shape, self.block_shape)
+        if blocks != rows * cols:
+            raise ValueError(f"Container block count mismatch: {blocks} vs {rows * cols}")
+
+    @property
+    def block_count(self) -> int:
+        return len(self.index)
+
+    def block_bounds(self, i: int) -> tuple[int, int, int, int]:
+        return block_bounds(self.shape, self.block_shape, i)
+
+    def block_shape_of(self, i: int) -> tuple:
+        y0, y1, x0, x1 = self.block_bounds(i)
+        return (y1 - y0, x1 - x0, self.shape[2])
+
+    def blocks_in_region(self, y0: int, y1: int, x0: int, x1: int) -> list[int]:
+        """Chỉ số các khối giao với vùng [y0, y1) x [x0, x1), theo thứ tự hàng trước."""
+        bh, bw = self.block_shape
+        cols = block_grid(self.shape, self.block_shape)[1]
+        return [r * cols + q
+                for r in range(y0 // bh, -(-y1 // bh))
+                for q in range(x0 // bw, -(-x1 // bw))]
+
+    def verify_block(self, i: int) -> bool:
+        """True nếu CRC của khối thứ i khớp (hoặc container không có CRC); không giải nén."""
+        offset, length = self.index[i]
+        if offset + length > len(self._mm):
+            return False
+        if self.crcs is None:
+            return True
+        with memoryview(self._mm) as view:
+            return zlib.crc32(view[offset:offset + length]) == self.crcs[i]
+
+    def read_block(self, i: int) -> tuple[bytes, bytes, tuple]:
+        """Trả về (data, metadata, shape) của khối thứ i; raise ValueError nếu CRC không khớp."""
+        offset, length = self.index[i]
+        if offset + length > len(self._mm):
+            raise ValueError(f"Incomplete container file: truncated block {i}")
+        if not self.verify_block(i):
+            raise ValueError(f"Checksum mismatch in container block {i}")
+        meta_len = struct.unpack_from('<I', self._mm, offset)[0]
+        start = offset + 4 + meta_len
+        metadata = self._mm[offset + 4:start]
+        return self._mm[start:offset + length], metadata, self.block_shape_of(i)
+
+    def iter_blocks(self):
+        for i in range(self.block_count):
+            yield self.read_block(i)
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
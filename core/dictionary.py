@@ -0,0 +1,76 @@
+# core/dictionary.py
+"""
+Từ điển Huffman dùng chung cho một lô ảnh tương tự nhau (ví dụ hàng nghìn ảnh scan).
+
+Bảng độ dài mã được huấn luyện một lần từ tập ảnh mẫu và lưu thành file riêng có ID; khi nén
+với từ điển, mỗi file chỉ ghi ID (4 byte) thay cho bảng 128 byte và bỏ qua bước đếm histogram
++ dựng cây của từng ảnh. Mọi giá trị 0..255 đều có mã nên ảnh ngoài tập mẫu vẫn nén được
+(kém tối ưu hơn nếu phân bố khác xa).
+
+    d = HuffmanDictionary.train(sample_images, transform="ycocg+planar+up")
+    d.save("scans.hdict")
+    comp = HuffmanCompressor(dictionary=HuffmanDictionary.load("scans.hdict"), transform="ycocg+planar+up")
+
+Bố cục file: b'HDIC' | version (1B) | id (uint32) | 256 độ dài mã (4 bit mỗi giá trị)
+ID là crc32 của bảng độ dài nên hai từ điển cho cùng bảng mã có cùng ID.
+"""
+import struct
+import zlib
+
+import numpy as np
+
+from .filters import Transform
+from .huffman import _LENGTHS_SIZE, _canonical_codes, _code_lengths, _pack_lengths, _unpack_lengths
+
+_MAGIC = b'HDIC'
+_VERSION = 1
+_HEADER = struct.Struct('<4sBI')
+
+
+class HuffmanDictionary:
+    def __init__(self, lengths: np.ndarray):
+        lengths = np.asarray(lengths, dtype=np.uint32)
+        if lengths.shape != (256,) or not lengths.all():
+            raise ValueError("Dictionary must assign a code to all 256 values")
+        # Kiểm tra bất đẳng thức Kraft ngay khi tạo thay vì lúc nén
+        self.codes = _canonical_codes(lengths)
+        self.lengths = lengths
+        self.id = zlib.crc32(_pack_lengths(lengths))
+
+    @classmethod
+    def train(cls, images, transform=None) -> "HuffmanDictionary":
+        """Dựng từ điển từ histogram cộng dồn của các ảnh mẫu (iterable, đọc lần lượt từng ảnh).
+
+        transform phải trùng với transform của compressor sẽ dùng từ điển. Mỗi giá trị được
+        cộng thêm 1 lần xuất hiện để luôn có mã.
+        """
+        transform = Transform.parse(transform)
+        counts = np.ones(256, dtype=np.int64)
+        for img in images:
+            data = transform.forward(img)[0] if transform else img
+            counts += np.bincount(np.ravel(data), minlength=256)
+        return cls(_code_lengths(counts))
+
+    def save(self, path: str):
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, self.id))
+            f.write(_pack_lengths(self.lengths))
+
+    @classmethod
+    def load(cls, path: str) -> "HuffmanDictionary":
+        with open(path, 'rb') as f:
+            buf = f.read()
+        if buf[:4] != _MAGIC:
+            raise ValueError("Invalid Huffman dictionary file")
+        if len(buf) < _HEADER.size + _LENGTHS_SIZE:
+            raise ValueError("Incomplete Huffman dictionary file")
+        _, version, dict_id = _HEADER.unpack_from(buf)
+        if version != _VERSION:
+            raise ValueError(f"Unsupported Huffman dictionary version: {version}")
+        d = cls(_unpack_lengths(buf[_HEADER.size:_HEADER.size + _LENGTHS_SIZE]))
+        if d.id != dict_id:
+            raise ValueError("Checksum mismatch: dictionary file is corrupted")
+        return d
+
+    def __repr__(self) -> str:
+        return f"HuffmanDictionary(id={self.id:08x})"
@@ -0,0 +1,241 @@
+# core/fileformat.py
+"""
+Header chung của các file nén một khối (.huff, .rle, .rlev, .hyb, .rans) và kiểm tra toàn vẹn.
+
+File mới được ghi theo bố cục có checksum:
+    tiền tố | h, w, c | meta_len | crc32 | metadata | data        (uint32, little-endian)
+trong đó tiền tố là magic (RLEC, RLVC, HYBC, RANS) hoặc với .huff là HUFF + 4 byte 0 + phiên bản 4,
+và crc32 tính trên mọi byte đứng trước nó (tiền tố, h, w, c, meta_len) + metadata + data, nên
+header bị sửa (ví dụ kích thước ảnh) cũng bị phát hiện. File cụt hoặc hỏng bị phát hiện ngay
+khi mở thay vì sau một lần giải nén dài. Các bố cục cũ (RLE0, RLE1, RLEV, HYB0, .huff v1-v3) vẫn đọc được.
+
+inspect()/verify() mở file qua mmap: inspect() chỉ chạm tới header (và index của container),
+verify() chỉ tính CRC, không dựng lại pixel.
+"""
+import os
+import struct
+import zlib
+
+from .container import ContainerReader
+from .profiling import count, stage
+from .utils import map_file
+
+_HUFF_MARKER = b'\x00\x00\x00\x00'
+_HUFF_CHECKED = 4
+_CHECKED = struct.Struct('<IIIII')   # h, w, c, meta_len, crc32
+_META = struct.Struct('<IIII')       # h, w, c, meta_len (cũng là phần đầu của _CHECKED)
+
+# magic -> (tên codec, bố cục)
+FORMATS = {
+    b'RLE0': ("RLE", "plain"),
+    b'RLE1': ("RLE", "meta"),
+    b'RLEC': ("RLE", "checked"),
+    b'RLEV': ("RLEV", "meta"),
+    b'RLVC': ("RLEV", "checked"),
+    b'HYB0': ("Hybrid", "meta"),
+    b'HYBC': ("Hybrid", "checked"),
+    b'RANS': ("rANS", "checked"),
+}
+# Tiền tố khi ghi file có checksum của từng codec
+_PREFIXES = {
+    "RLE": b'RLEC',
+    "RLEV": b'RLVC',
+    "Hybrid": b'HYBC',
+    "rANS": b'RANS',
+    "Huffman": b'HUFF' + _HUFF_MARKER + bytes([_HUFF_CHECKED]),
+}
+
+
+def crc32(*parts) -> int:
+    value = 0
+    for part in parts:
+        value = zlib.crc32(part, value)
+    return value
+
+
+class FileHeader:
+    """Thông tin header của một file nén; metadata và data là view vào buffer gốc.
+
+    head: các byte header đứng trước trường crc32 (cũng được tính vào CRC).
+    """
+
+    def __init__(self, codec: str, magic: bytes, version: int, shape: tuple, metadata, data, crc=None,
+                 head=b''):
+        self.codec = codec
+        self.magic = magic
+        self.version = version
+        self.shape = shape
+        self.metadata = metadata
+        self.data = data
+        self.crc = crc
+        self.head = head
+
+    def check(self):
+        """Raise ValueError nếu CRC không khớp (file không có CRC thì bỏ qua)."""
+        if self.crc is not None and crc32(self.head, self.metadata, self.data) != self.crc:
+            raise ValueError("Checksum mismatch: compressed file is corrupted")
+
+
+def _split(buf: memoryview, offset: int, meta_len: int, what: str) -> tuple:
+    metadata = buf[offset:offset + meta_len]
+    if len(metadata) < meta_len:
+        raise ValueError(f"Incomplete {what} file: missing metadata")
+    return metadata, buf[offset + meta_len:]
+
+
+def parse_header(buf) -> FileHeader:
+    """Nhận diện định dạng từ magic và tách header/metadata/data, không giải nén."""
+    buf = memoryview(buf)
+    magic = bytes(buf[:4])
+    if magic == b'HUFF':
+        return _parse_huff(buf)
+    if magic not in FORMATS:
+        raise ValueError("Unknown compressed file format")
+    codec, layout = FORMATS[magic]
+    what = f"{codec} ({magic.decode('ascii')})"
+    if layout == "plain":
+        if len(buf) < 16:
+            raise ValueError(f"Incomplete {what} file: missing header")
+        return FileHeader(codec, magic, 0, struct.unpack_from('<III', buf, 4), buf[16:16], buf[16:])
+    if layout == "meta":
+        if len(buf) < 4 + _META.size:
+            raise ValueError(f"Incomplete {what} file: missing header")
+        h, w, c, meta_len = _META.unpack_from(buf, 4)
+        return FileHeader(codec, magic, 0, (h, w, c), *_split(buf, 4 + _META.size, meta_len, what))
+    if len(buf) < 4 + _CHECKED.size:
+        raise ValueError(f"Incomplete {what} file: missing header")
+    h, w, c, meta_len, crc = _CHECKED.unpack_from(buf, 4)
+    return FileHeader(codec, magic, 0, (h, w, c), *_split(buf, 4 + _CHECKED.size, meta_len, what), crc,
+                      buf[:4 + _META.size])
+
+
+def _parse_huff(buf: memoryview) -> FileHeader:
+    if len(buf) < 9:
+        raise ValueError("Incomplete .huff file: missing header")
+    if buf[4:8] != _HUFF_MARKER:
+        # v1: HUFF + h, w, c + padding + độ dài cây + cây Huffman tuần tự hóa + dữ liệu
+        if len(buf) < 21:
+            raise ValueError("Incomplete .huff file: missing header")
+        shape = struct.unpack_from('<III', buf, 4)
+        tree_len = struct.unpack_from('<I', buf, 17)[0]
+        if len(buf) < 21 + tree_len:
+            raise ValueError("Incomplete .huff file: missing tree")
+        return FileHeader("Huffman", b'HUFF', 1, shape, buf[16:21 + tree_len], buf[21 + tree_len:])
+
+    version = buf[8]
+    if version in (2, 3):
+        if len(buf) < 9 + _META.size:
+            raise ValueError("Incomplete .huff file: missing header")
+        h, w, c, meta_len = _META.unpack_from(buf, 9)
+        return FileHeader("Huffman", b'HUFF', version, (h, w, c), *_split(buf, 9 + _META.size, meta_len, ".huff"))
+    if version == _HUFF_CHECKED:
+        if len(buf) < 9 + _CHECKED.size:
+            raise ValueError("Incomplete .huff file: missing header")
+        h, w, c, meta_len, crc = _CHECKED.unpack_from(buf, 9)
+        return FileHeader("Huffman", b'HUFF', version, (h, w, c),
+                          *_split(buf, 9 + _CHECKED.size, meta_len, ".huff"), crc, buf[:9 + _META.size])
+    raise ValueError(f"Unsupported .huff version: {version}")
+
+
+def read_header(buf, codec: str, ext: str) -> FileHeader:
+    """parse_header() + kiểm tra file đúng codec và CRC khớp, dùng trong from_bytes của codec."""
+    try:
+        header = parse_header(buf)
+    except ValueError as e:
+        if str(e) == "Unknown compressed file format":
+            raise ValueError(f"Invalid {ext} file") from None
+        raise
+    if header.codec != codec:
+        raise ValueError(f"Invalid {ext} file")
+    header.check()
+    return header
+
+
+def file_size(codec: str, metadata, data) -> int:
+    """Số byte chính xác của file nén một khối, không cần ghi hay đóng gói."""
+    return len(_PREFIXES[codec]) + _CHECKED.size + len(metadata or b'') + len(data)
+
+
+def pack_file(codec: str, shape: tuple, metadata, data) -> bytearray:
+    """Nội dung file nén một khối (bố cục có checksum) trong một bytearray cấp phát đúng kích thước."""
+    metadata = metadata or b''
+    h, w, c = shape
+    prefix = _PREFIXES[codec]
+    buf = bytearray(file_size(codec, metadata, data))
+    buf[:len(prefix)] = prefix
+    head = len(prefix) + _META.size
+    _META.pack_into(buf, len(prefix), h, w, c, len(metadata))
+    # CRC phủ cả tiền tố và h, w, c, meta_len (mọi byte trước trường crc32)
+    struct.pack_into('<I', buf, head, crc32(buf[:head], metadata, data))
+    start = len(prefix) + _CHECKED.size
+    buf[start:start + len(metadata)] = metadata
+    buf[start + len(metadata):] = data
+    return buf
+
+
+def write_file(path: str, codec: str, shape: tuple, metadata, data):
+    """Ghi file nén một khối theo bố cục có checksum bằng một lần write."""
+    buf = pack_file(codec, shape, metadata, data)
+    count("bytes_written", len(buf))
+    with stage("write"), open(path, 'wb') as f:
+        f.write(buf)
+
+
+def inspect(path: str) -> dict:
+    """Codec, kích thước ảnh, số khối, tỉ lệ nén... chỉ từ header/index, không giải nén."""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    if magic == b'IMGB':
+        with ContainerReader(path) as reader:
+            info = {"format": "IMGB", "codec": reader.codec, "version": reader.version,
+                    "shape": list(reader.shape), "block_shape": list(reader.block_shape),
+                    "blocks": reader.block_count, "checksum": reader.crcs is not None}
+    else:
+        with map_file(path) as buf:
+            header = parse_header(buf)
+            info = {"format": header.magic.decode('ascii'), "codec": header.codec,
+                    "version": header.version, "shape": list(header.shape), "blocks": 1,
+                    "checksum": header.crc is not None, "metadata_bytes": len(header.metadata)}
+            if header.codec == "Huffman" and header.version >= 2:
+                from .huffman import _DICTIONARY_FLAG
+                if len(header.metadata) >= 5 and header.metadata[0] & _DICTIONARY_FLAG:
+                    info["dictionary"] = f"{struct.unpack_from('<I', header.metadata, 1)[0]:08x}"
+            del header
+    raw = info["shape"][0] * info["shape"][1] * info["shape"][2]
+    return {"file": path, **info, "file_bytes": size, "raw_bytes": raw,
+            "ratio": round(size / raw, 4) if raw else None}
+
+
+def verify(path: str) -> dict:
+    """
+    Kiểm tra CRC của file (từng khối với container) mà không giải nén. File định dạng cũ
+    không có CRC chỉ được kiểm tra cấu trúc ("checksum": false). Khóa "error" có mặt khi lỗi.
+    """
+    try:
+        return _verify(path)
+    except ValueError as e:
+        return {"file": path, "ok": False, "error": str(e)}
+
+
+def _verify(path: str) -> dict:
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    if magic == b'IMGB':
+        with ContainerReader(path) as reader:
+            bad = [i for i in range(reader.block_count) if not reader.verify_block(i)]
+            result = {"file": path, "codec": reader.codec, "checksum": reader.crcs is not None,
+                      "blocks": reader.block_count, "bad_blocks": bad}
+        if bad:
+            result["error"] = f"Checksum mismatch in {len(bad)} block(s)"
+        return {**result, "ok": not bad}
+
+    with map_file(path) as buf:
+        header = parse_header(buf)
+        result = {"file": path, "codec": header.codec, "checksum": header.crc is not None, "blocks": 1}
+        try:
+            header.check()
+        except ValueError as e:
+            result["error"] = str(e)
+        del header
+    return {**result, "ok": "error" not in result}
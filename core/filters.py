@@ -0,0 +1,265 @@
+# core/filters.py
+"""
+Các phép biến đổi khả nghịch áp dụng trước khi mã hóa để ảnh dễ nén hơn:
+- YCoCg-R: đổi màu RGB bằng các bước lifting số nguyên (mod 256) nên đảo ngược chính xác;
+- planar: tách kênh thành các mặt phẳng liên tiếp thay vì xen kẽ RGBRGB...;
+- bộ dự đoán theo hàng kiểu PNG (None/Sub/Up/Average/Paeth), cố định hoặc chọn thích nghi
+  cho từng hàng; dữ liệu mã hóa là phần dư (giá trị thật - dự đoán) mod 256.
+
+Header của phép biến đổi (lưu trong metadata của codec):
+    flags (1B: bit 0 = YCoCg-R, bit 1 = planar) | mã bộ dự đoán (1B) | [mã bộ dự đoán từng hàng]
+"""
+import numpy as np
+
+PREDICTORS = ("none", "sub", "up", "avg", "paeth")
+ADAPTIVE = "adaptive"
+# Mã bộ dự đoán trong header khi mỗi hàng có bộ dự đoán riêng
+_ADAPTIVE_CODE = 255
+_FLAG_YCOCG = 1
+_FLAG_PLANAR = 2
+
+
+class Transform:
+    """Cấu hình biến đổi trước khi nén, ví dụ Transform.parse("ycocg+planar+adaptive")."""
+
+    def __init__(self, color: str = None, planar: bool = False, predictor: str = None):
+        if color not in (None, "ycocg"):
+            raise ValueError(f"Unknown color transform: {color}")
+        if predictor not in (None, ADAPTIVE) + PREDICTORS:
+            raise ValueError(f"Unknown predictor: {predictor}")
+        self.color = color
+        self.planar = planar
+        self.predictor = None if predictor == "none" else predictor
+
+    @classmethod
+    def parse(cls, spec):
+        """Nhận Transform, None hoặc chuỗi các bước nối bằng '+' (ycocg, planar, tên bộ dự đoán)."""
+        if spec is None or isinstance(spec, Transform):
+            return spec
+        color, planar, predictor = None, False, None
+        for part in filter(None, spec.lower().replace(",", "+").split("+")):
+            if part == "ycocg":
+                color = "ycocg"
+            elif part == "planar":
+                planar = True
+            elif part in PREDICTORS or part == ADAPTIVE:
+                predictor = part
+            else:
+                raise ValueError(f"Unknown transform step: {part}")
+        transform = cls(color, planar, predictor)
+        return transform if transform.color or transform.planar or transform.predictor else None
+
+    def __repr__(self) -> str:
+        steps = [s for s in (self.color, "planar" if self.planar else None, self.predictor) if s]
+        return f"Transform({'+'.join(steps)!r})"
+
+    def forward(self, img: np.ndarray) -> tuple[np.ndarray, bytes]:
+        """Trả về (mảng uint8 đã biến đổi, cùng số phần tử với img; header để đảo ngược)."""
+        flags = 0
+        x = img
+        if self.color == "ycocg" and img.shape[2] >= 3:
+            x = _ycocg_forward(x)
+            flags |= _FLAG_YCOCG
+        if self.planar:
+            x = x.transpose(2, 0, 1)[..., None]
+            flags |= _FLAG_PLANAR
+        else:
+            x = x[None]
+
+        x = np.ascontiguousarray(x)
+        if self.predictor is None:
+            return x, bytes([flags, 0])
+        if self.predictor == ADAPTIVE:
+            residual, ids = _predict_adaptive(x)
+            return residual, bytes([flags, _ADAPTIVE_CODE]) + ids.tobytes()
+        code = PREDICTORS.index(self.predictor)
+        return _residual(x, code, *_neighbours(x)), bytes([flags, code])
+
+
+def layout(shape: tuple, header) -> tuple:
+    """Dạng (mặt phẳng, hàng, cột, kênh) của dữ liệu Transform.forward trả về cho ảnh shape."""
+    h, w, c = shape
+    if header and header[0] & _FLAG_PLANAR:
+        return c, h, w, 1
+    return 1, h, w, c
+
+
+def inverse(flat: np.ndarray, shape: tuple, header) -> np.ndarray:
+    """Đảo ngược Transform.forward: flat là dữ liệu đã giải mã, header lấy từ metadata."""
+    h, w, c = shape
+    if len(header) < 2:
+        raise ValueError("Incomplete transform header")
+    flags, code = header[0], header[1]
+    planar = bool(flags & _FLAG_PLANAR)
+    dims = layout(shape, header)
+    x = flat.reshape(dims)
+
+    if code == _ADAPTIVE_CODE:
+        ids = np.frombuffer(header, dtype=np.uint8, offset=2)
+        if ids.size != dims[0] * h:
+            raise ValueError("Transform header row count mismatch")
+        if ids.size and ids.max() >= len(PREDICTORS):
+            raise ValueError("Invalid predictor in transform header")
+        x = _unpredict(x, ids.reshape(dims[0], h))
+    elif code:
+        if code >= len(PREDICTORS):
+            raise ValueError(f"Invalid predictor in transform header: {code}")
+        x = _unpredict(x, np.full((dims[0], h), code, dtype=np.uint8))
+
+    x = x[..., 0].transpose(1, 2, 0) if planar else x[0]
+    if flags & _FLAG_YCOCG:
+        x = _ycocg_inverse(x)
+    return np.ascontiguousarray(x)
+
+
+def _half(v: np.ndarray) -> np.ndarray:
+    """floor(v / 2) với v hiểu là số có dấu 8 bit, kết quả lại là uint8 (mod 256)."""
+    return (v.view(np.int8) >> 1).view(np.uint8)
+
+
+def _ycocg_forward(img: np.ndarray) -> np.ndarray:
+    # Lifting mod 256: mỗi bước cộng một hàm của giá trị đã lưu nên luôn đảo ngược được,
+    # và khi |R - B|, |G - t| < 128 thì trùng với YCoCg-R thông thường
+    r, g, b = img[..., 0], img[..., 1], img[..., 2]
+    co = r - b
+    t = b + _half(co)
+    cg = g - t
+    y = t + _half(cg)
+    out = img.copy()
+    out[..., 0], out[..., 1], out[..., 2] = y, co, cg
+    return out
+
+
+def _ycocg_inverse(img: np.ndarray) -> np.ndarray:
+    y, co, cg = img[..., 0], img[..., 1], img[..., 2]
+    t = y - _half(cg)
+    g = cg + t
+    b = t - _half(co)
+    r = b + co
+    out = img.copy()
+    out[..., 0], out[..., 1], out[..., 2] = r, g, b
+    return out
+
+
+def _neighbours(x: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Pixel bên trái (a), phía trên (b), trên-trái (c) của mỗi vị trí; ngoài biên là 0.
+
+    x có dạng (mặt phẳng, hàng, cột, kênh xen kẽ); "bên trái" là pixel trước cùng kênh.
+    """
+    a = np.zeros_like(x)
+    b = np.zeros_like(x)
+    c = np.zeros_like(x)
+    a[:, :, 1:] = x[:, :, :-1]
+    b[:, 1:] = x[:, :-1]
+    c[:, 1:, 1:] = x[:, :-1, :-1]
+    return a, b, c
+
+
+def _paeth(a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    a16, b16, c16 = a.astype(np.int16), b.astype(np.int16), c.astype(np.int16)
+    pa = np.abs(b16 - c16)
+    pb = np.abs(a16 - c16)
+    pc = np.abs(a16 + b16 - 2 * c16)
+    # Chọn không rẽ nhánh (nhân với mặt nạ 0/1, mod 256) nhanh hơn np.where lồng nhau
+    out = c + (b - c) * (pb <= pc).view(np.uint8)
+    out += (a - out) * ((pa <= pb) & (pa <= pc)).view(np.uint8)
+    return out
+
+
+def _prediction(code: int, a, b, c):
+    if code == 1:
+        return a
+    if code == 2:
+        return b
+    if code == 3:
+        return ((a.astype(np.uint16) + b) >> 1).astype(np.uint8)
+    return _paeth(a, b, c)
+
+
+def _residual(x: np.ndarray, code: int, a, b, c) -> np.ndarray:
+    return x.copy() if code == 0 else x - _prediction(code, a, b, c)
+
+
+def _predict_adaptive(x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Chọn cho mỗi hàng bộ dự đoán có tổng |phần dư| (hiểu là số có dấu) nhỏ nhất, như libpng."""
+    a, b, c = _neighbours(x)
+    best = None
+    for code in range(len(PREDICTORS)):
+        res = _residual(x, code, a, b, c)
+        cost = np.minimum(res, -res).sum(axis=(2, 3), dtype=np.int64)
+        if best is None:
+            best, best_cost, ids = res, cost, np.zeros(cost.shape, dtype=np.uint8)
+            continue
+        better = cost < best_cost
+        best[better] = res[better]
+        best_cost = np.where(better, cost, best_cost)
+        ids[better] = code
+    return best, ids
+
+
+def _unpredict(res: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """Dựng lại ảnh từ phần dư; ids[p, y] là bộ dự đoán của hàng y trong mặt phẳng p."""
+    if ids.size and ids.max() <= 2:
+        return _unpredict_rows(res, ids)
+    return _unpredict_wavefront(res, ids)
+
+
+def _unpredict_rows(res: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    # None/Sub/Up chỉ phụ thuộc trong một hàng hoặc hàng trước: giải từng hàng, vector hóa theo cột
+    out = np.empty_like(res)
+    prev = np.zeros_like(res[:, 0])
+    for y in range(res.shape[1]):
+        row = res[:, y].copy()
+        up = ids[:, y] == 2
+        row[up] += prev[up]
+        sub = ids[:, y] == 1
+        if sub.any():
+            row[sub] = np.cumsum(res[:, y][sub], axis=1, dtype=np.uint8)
+        out[:, y] = prev = row
+    return out
+
+
+def _unpredict_wavefront(res: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """
+    Average/Paeth cần pixel bên trái đã giải nên không vector hóa theo hàng được. Pixel (y, x)
+    chỉ phụ thuộc các pixel có y + x nhỏ hơn, nên giải lần lượt từng đường chéo k = y + x:
+    mỗi bước vector hóa trên mọi hàng (và mặt phẳng) cắt đường chéo đó.
+    """
+    P, H, W, B = res.shape
+    K = H + W - 1
+    # Bố cục lệch: skew[k] chứa đường chéo k; skew có thêm 2 đường chéo và 1 hàng 0 ở đầu
+    # làm biên, lưu int16 để các phép dự đoán không phải đổi kiểu ở mỗi bước
+    skew_res = np.zeros((K, P, H, B), dtype=np.uint8)
+    _diagonals(skew_res, W)[...] = res
+    skew = np.zeros((K + 2, P, H + 1, B), dtype=np.int16)
+
+    kinds = ids[..., None]
+    is_none, is_up, is_avg, is_paeth = (kinds == 0), (kinds == 2), (kinds == 3), (kinds == 4)
+    has_none, has_avg, has_paeth = is_none.any(), is_avg.any(), is_paeth.any()
+    for k in range(K):
+        y0, y1 = max(0, k - W + 1), min(H, k + 1)
+        a = skew[k + 1, :, y0 + 1:y1 + 1]
+        b = skew[k + 1, :, y0:y1]
+        pred = np.where(is_up[:, y0:y1], b, a)
+        if has_avg:
+            np.copyto(pred, (a + b) >> 1, where=is_avg[:, y0:y1])
+        if has_paeth:
+            c = skew[k, :, y0:y1]
+            p = a + b - c
+            pa, pb, pc = np.abs(p - a), np.abs(p - b), np.abs(p - c)
+            paeth = np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+            np.copyto(pred, paeth, where=is_paeth[:, y0:y1])
+        if has_none:
+            np.copyto(pred, 0, where=is_none[:, y0:y1])
+        pred += skew_res[k, :, y0:y1]
+        pred &= 255
+        skew[k + 2, :, y0 + 1:y1 + 1] = pred
+
+    return _diagonals(skew[2:, :, 1:], W).astype(np.uint8)
+
+
+def _diagonals(skew: np.ndarray, width: int) -> np.ndarray:
+    """View (mặt phẳng, hàng, cột, kênh) của mảng lệch skew[y + x, p, y, b], không chép dữ liệu."""
+    sk, sp, sy, sb = skew.strides
+    _, P, H, B = skew.shape
+    return np.lib.stride_tricks.as_strided(skew, shape=(P, H, width, B), strides=(sp, sk + sy, sk, sb))
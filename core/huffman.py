@@ -1,36 +1,502 @@
 # core/huffman.py
 from .compressor import Compressor
+from .fileformat import read_header, write_file
+from .profiling import count, stage
+from .utils import map_file
 import numpy as np
-from collections import Counter
-import heapq
 import struct
-import io
 
 
 class Node:
+    """Nút cây Huffman, chỉ còn dùng để đọc file v1 (lưu cây tuần tự hóa)."""
+    __slots__ = ('val', 'freq', 'left', 'right')
+
     def __init__(self, val=None, freq=0, left=None, right=None):
         self.val = val
         self.freq = freq
         self.left = left
         self.right = right
 
-    def __lt__(self, other): return self.freq < other.freq
+
+# Độ dài mã tối đa của định dạng v2 (mỗi độ dài lưu trong 4 bit)
+MAX_CODE_LEN = 15
+_LENGTHS_SIZE = 128
+
+# Số pixel xử lý mỗi lượt khi đóng gói bit (giới hạn bộ nhớ tạm)
+_PACK_CHUNK = 1 << 17
+# Khoảng cách tối đa (số symbol) giữa hai điểm đồng bộ ghi trong metadata; số bit của mỗi
+# nhóm lưu trong uint16 nên cần _SYNC_INTERVAL * MAX_CODE_LEN < 65536
+_SYNC_INTERVAL = 1024
+# Khoảng cách tối thiểu giữa hai điểm đồng bộ: ảnh nhỏ dùng nhóm dài hơn để chỉ mục (2 byte
+# mỗi nhóm) không chiếm quá vài phần trăm dữ liệu
+_MIN_SYNC_INTERVAL = 64
+# Bit cao của byte padding: metadata tham chiếu từ điển (ID uint32) thay cho bảng độ dài mã
+_DICTIONARY_FLAG = 0x80
+
+
+def _histogram(flat: np.ndarray) -> np.ndarray:
+    """Tần suất của 256 giá trị pixel (một lượt np.bincount trên mảng uint8)."""
+    return np.bincount(flat, minlength=256)
+
+
+def _code_lengths(counts: np.ndarray, max_len: int = MAX_CODE_LEN) -> np.ndarray:
+    """Độ dài mã Huffman tối ưu từ histogram 256 phần tử, giới hạn max_len bit.
+
+    Thuật toán Moffat-Katajainen chạy tại chỗ trên danh sách tần suất đã sắp tăng dần (không
+    dựng cây): lượt 1 ghép hai nút nhỏ nhất và lưu chỉ số cha, lượt 2 đổi chỉ số cha thành độ
+    sâu nút trong, lượt 3 suy ra độ sâu của lá. Chi phí chỉ phụ thuộc số giá trị có mặt (<= 256).
+    """
+    lengths = np.zeros(256, dtype=np.uint32)
+    present = np.flatnonzero(counts)
+    n = len(present)
+    if n <= 1:
+        # Một giá trị duy nhất: dùng mã 1 bit để luôn có dữ liệu giải mã được
+        lengths[present] = 1
+        return lengths
+    order = present[np.argsort(counts[present], kind='stable')]
+    a = counts[order].tolist()
+
+    a[0] += a[1]
+    root, leaf = 0, 2
+    for nxt in range(1, n - 1):
+        if leaf >= n or a[root] < a[leaf]:
+            a[nxt] = a[root]
+            a[root] = nxt
+            root += 1
+        else:
+            a[nxt] = a[leaf]
+            leaf += 1
+        if leaf >= n or (root < nxt and a[root] < a[leaf]):
+            a[nxt] += a[root]
+            a[root] = nxt
+            root += 1
+        else:
+            a[nxt] += a[leaf]
+            leaf += 1
+
+    a[n - 2] = 0
+    for nxt in range(n - 3, -1, -1):
+        a[nxt] = a[a[nxt]] + 1
+
+    avail, used, depth = 1, 0, 0
+    root, nxt = n - 2, n - 1
+    while avail > 0:
+        while root >= 0 and a[root] == depth:
+            used += 1
+            root -= 1
+        while avail > used:
+            a[nxt] = depth
+            nxt -= 1
+            avail -= 1
+        avail, depth, used = 2 * used, depth + 1, 0
+
+    lengths[order] = a
+    return _limit_lengths(lengths, max_len)
+
+
+def _code_table(codes: dict) -> tuple[np.ndarray, np.ndarray]:
+    """Chuyển {pixel: '0101'} thành bảng tra 256 phần tử: mã căn trái trong uint64 và độ dài."""
+    aligned = np.zeros(256, dtype=np.uint64)
+    lengths = np.zeros(256, dtype=np.uint32)
+    for val, code in codes.items():
+        if len(code) > 64:
+            raise ValueError(f"Huffman code too long: {len(code)} bits")
+        if code:
+            aligned[val] = int(code, 2) << (64 - len(code))
+        lengths[val] = len(code)
+    return aligned, lengths
+
+
+def _pack_codes(flat: np.ndarray, aligned: np.ndarray, lengths: np.ndarray,
+                progress=None, interval: int = _SYNC_INTERVAL) -> tuple[bytes, int, np.ndarray]:
+    """Ghép mã của từng pixel thành dòng bit MSB-first.
+
+    Trả về (bytes, số bit padding, số bit của từng nhóm `interval` symbol) - phần cuối là
+    chỉ mục điểm đồng bộ cho bộ giải mã. Vị trí bit của từng mã tính bằng cumsum độ dài;
+    mỗi mã (<= 64 bit) rơi vào tối đa hai word 64 bit nên chỉ cần dịch phải rồi cộng dồn
+    theo word (các bit không chồng nhau), phần vắt sang word sau được OR riêng.
+    """
+    if len(flat) == 0 or not lengths.any():
+        return b'', 0, np.zeros(0, dtype=np.uint32)
+
+    pieces = []
+    groups = []
+    carry = np.uint64(0)  # word 64 bit đang ghi dở
+    bitpos = 0            # số bit đã dùng trong carry
+    for start in range(0, len(flat), _PACK_CHUNK):
+        sym = flat[start:start + _PACK_CHUNK]
+        lens = lengths[sym]
+        # _PACK_CHUNK là bội của interval nên mỗi nhóm nằm gọn trong một lượt
+        groups.append(np.add.reduceat(lens, np.arange(0, len(sym), interval)))
+        ends = np.cumsum(lens, dtype=np.uint32)
+        ends += bitpos
+        starts = ends - lens
+        word = starts >> 6
+        offset = starts & 63
+        code = aligned[sym]
+
+        total = int(ends[-1])
+        out = np.zeros((total >> 6) + 1, dtype=np.uint64)
+        first = np.flatnonzero(word[1:] != word[:-1]) + 1
+        first = np.concatenate(([0], first))
+        out[word[first]] = np.add.reduceat(code >> offset, first)
+        # Phần tràn sang word kế tiếp: mỗi ranh giới word chỉ có tối đa một mã vắt qua
+        spill = np.flatnonzero((starts & 63) + lens > 64)
+        out[word[spill] + 1] |= code[spill] << (64 - offset[spill])
+        out[0] |= carry
+
+        pieces.append(out[:total >> 6].astype('>u8').tobytes())
+        carry = out[total >> 6]
+        bitpos = total & 63
+        if progress:
+            progress(start + len(sym), len(flat))
+
+    # Padding to byte boundary (các bit thừa của word cuối đã là 0)
+    if bitpos:
+        pieces.append(np.array([carry], dtype='>u8').tobytes()[:(bitpos + 7) // 8])
+    padding = (8 - bitpos % 8) % 8
+    return b''.join(pieces), padding, np.concatenate(groups)
+
+
+def _limit_lengths(lengths: np.ndarray, max_len: int) -> np.ndarray:
+    """Giới hạn độ dài mã <= max_len mà vẫn giữ bất đẳng thức Kraft (JPEG Annex K.3).
+
+    Đếm số mã theo từng độ dài, dồn các mã quá dài lên trên rồi gán lại độ dài mới cho
+    symbol theo thứ tự độ dài cũ (symbol có mã ngắn vẫn nhận mã ngắn).
+    """
+    longest = int(lengths.max())
+    if longest <= max_len:
+        return lengths
+    bl_count = np.bincount(lengths, minlength=longest + 1)
+    bl_count[0] = 0
+    for i in range(longest, max_len, -1):
+        while bl_count[i] > 0:
+            j = i - 2
+            while bl_count[j] == 0:
+                j -= 1
+            bl_count[i] -= 2
+            bl_count[i - 1] += 1
+            bl_count[j + 1] += 2
+            bl_count[j] -= 1
+
+    present = np.flatnonzero(lengths)
+    order = present[np.argsort(lengths[present], kind='stable')]
+    limited = np.zeros_like(lengths)
+    limited[order] = np.repeat(np.arange(max_len + 1), bl_count[:max_len + 1])
+    return limited
+
+
+def _canonical_codes(lengths: np.ndarray) -> np.ndarray:
+    """Mã canonical (căn trái trong uint64) từ độ dài mã: sắp theo (độ dài, giá trị) rồi đánh số tăng dần."""
+    aligned = np.zeros(256, dtype=np.uint64)
+    present = np.flatnonzero(lengths)
+    order = present[np.lexsort((present, lengths[present]))]
+    code, prev = 0, 0
+    for s in order.tolist():
+        n = int(lengths[s])
+        code <<= n - prev
+        prev = n
+        if code >> n:
+            raise ValueError("Invalid Huffman code lengths")
+        aligned[s] = code << (64 - n)
+        code += 1
+    return aligned
+
+
+def _pack_lengths(lengths: np.ndarray) -> bytes:
+    """256 độ dài mã x 4 bit -> 128 byte (symbol chẵn ở nibble cao)."""
+    return ((lengths[0::2] << 4) | lengths[1::2]).astype(np.uint8).tobytes()
+
+
+def _unpack_lengths(buf) -> np.ndarray:
+    packed = np.frombuffer(buf, dtype=np.uint8)
+    if packed.size != _LENGTHS_SIZE:
+        raise ValueError("Incomplete Huffman code length table")
+    lengths = np.empty(256, dtype=np.uint32)
+    lengths[0::2] = packed >> 4
+    lengths[1::2] = packed & 0x0F
+    return lengths
+
+
+# Bảng tra cấp 1 của bộ giải mã dùng tối đa bấy nhiêu bit; mã dài hơn tra tiếp bảng phụ
+_PRIMARY_BITS = 11
+# Mỗi đoạn giải mã song song dài bấy nhiêu bit
+_SEGMENT_BITS = 512
+# Giới hạn số ô (bước x đoạn) của bộ đệm tạm cho mỗi lượt giải mã
+_DECODE_CELLS = 1 << 21
+# Cửa sổ đọc là 8 byte dịch trái tối đa 7 bit nên mã dài nhất có thể tra là 57 bit
+_MAX_TABLE_CODE_LEN = 57
+
+
+class _DecodeTable:
+    """Bảng tra 2 cấp dựng từ mã căn trái và độ dài mã.
+
+    Mỗi ô là một số uint16 ((symbol + 1) << 6 | độ dài); symbol 0 nghĩa là không có mã nào
+    khớp. Cấp 1 tra `bits` bit đầu của cửa sổ; tiền tố của mã dài hơn có độ dài 0 và trỏ
+    tới bảng phụ riêng (sub_off, sub_bits).
+    """
+
+    def __init__(self, aligned: np.ndarray, lengths: np.ndarray):
+        present = np.flatnonzero(lengths)
+        self.max_len = int(lengths.max())
+        if self.max_len > _MAX_TABLE_CODE_LEN:
+            raise ValueError(f"Huffman code too long for table decoding: {self.max_len} bits")
+        self.min_len = int(lengths[present].min())
+        self.bits = min(self.max_len, _PRIMARY_BITS)
+        p = self.bits
+
+        # Ô không hợp lệ vẫn cho độ dài min_len để các đoạn giải mã thử luôn tiến lên
+        self.entry = np.full(1 << p, self.min_len, dtype=np.uint16)
+        self.sub_off = np.zeros(1 << p, dtype=np.uint64)
+        self.sub_bits = np.zeros(1 << p, dtype=np.uint64)
+        groups = {}
+        for s in present.tolist():
+            n = int(lengths[s])
+            prefix = int(aligned[s]) >> (64 - p)
+            if n <= p:
+                self.entry[prefix:prefix + (1 << (p - n))] = ((s + 1) << 6) | n
+            else:
+                groups.setdefault(prefix, []).append(s)
+
+        subs = []
+        offset = 0
+        for prefix, syms in groups.items():
+            extra = max(int(lengths[s]) for s in syms) - p
+            sub = np.full(1 << extra, self.min_len, dtype=np.uint16)
+            for s in syms:
+                n = int(lengths[s])
+                idx = (int(aligned[s]) >> (64 - p - extra)) & ((1 << extra) - 1)
+                sub[idx:idx + (1 << (p + extra - n))] = ((s + 1) << 6) | n
+            self.entry[prefix] = 0
+            self.sub_off[prefix] = offset
+            self.sub_bits[prefix] = extra
+            subs.append(sub)
+            offset += 1 << extra
+        self.sub_entry = np.concatenate(subs) if subs else None
+
+    def lookup(self, window: np.ndarray) -> np.ndarray:
+        """Tra ô bảng cho các cửa sổ 64 bit (bit đầu tiên của mã là MSB)."""
+        prim = (window >> np.uint64(64 - self.bits)).view(np.int64)
+        entry = self.entry.take(prim)
+        if self.sub_entry is not None:
+            esc = np.flatnonzero(entry == 0)
+            if esc.size:
+                p = prim[esc]
+                rest = (window[esc] << np.uint64(self.bits)) >> (np.uint64(64) - self.sub_bits[p])
+                entry[esc] = self.sub_entry.take((self.sub_off[p] + rest).view(np.int64))
+        return entry
+
+
+def _unpack_codes(data, padding: int, aligned: np.ndarray, lengths: np.ndarray, count: int,
+                  progress=None) -> np.ndarray:
+    """Giải mã `count` symbol từ dòng bit MSB-first vào một mảng uint8 cấp phát sẵn.
+
+    Dòng bit được chia thành các đoạn _SEGMENT_BITS bit và mọi đoạn được giải mã đồng thời:
+    mỗi bước tra bảng cho tất cả các đoạn nên cho ra hàng nghìn symbol. Đoạn thứ i bắt đầu
+    đoán tại ranh giới đoạn; mã Huffman tự đồng bộ nên vị trí kết thúc thật của đoạn i-1
+    thường trùng một vị trí mà đoạn i đã đi qua - khi đó chỉ cần bỏ các symbol trước điểm
+    đó. Đoạn nào không đồng bộ được thì giải mã lại từ vị trí đúng. Khi các lượt giải mã lại
+    đã tốn ngang max_len lượt trên mọi đoạn (mã không tự đồng bộ, ví dụ mọi độ dài mã cùng là
+    3 bit), _chain_starts tính thẳng vị trí bắt đầu đúng của mọi đoạn, nên chi phí bị chặn
+    thay vì tăng theo bình phương số đoạn lệch.
+    """
+    out = np.empty(count, dtype=np.uint8)
+    if count == 0:
+        return out
+    if not lengths.any():
+        raise ValueError("Empty Huffman code table")
+
+    table = _DecodeTable(aligned, lengths)
+    raw = np.frombuffer(data, dtype=np.uint8)
+    nbits = raw.size * 8 - padding
+
+    max_steps = _SEGMENT_BITS // table.min_len + 1
+    nseg = max(1, _DECODE_CELLS // max_steps)
+    steps = np.arange(max_steps)[:, None]
+    # Điểm đồng bộ nằm trong max_len bit đầu của đoạn nên chỉ có thể là một trong vài bước đầu
+    sync_steps = min(max_steps, table.max_len // table.min_len + 1)
+    # Các đoạn chạy quá điểm kết thúc tối đa max_steps mã nên cần chừa thêm byte đệm
+    margin = (max_steps * table.max_len + 7) // 8 + 16
+    length_mask = np.uint16(63)
+
+    done = 0
+    start = 0
+    while done < count and start < nbits:
+        # Vị trí bit trong lượt này tính tương đối so với byte chứa `start`
+        base = start - start % 8
+        stop = min(start + nseg * _SEGMENT_BITS, nbits)
+        local = np.zeros((stop - base + 7) // 8 + margin, dtype=np.uint8)
+        piece = raw[base // 8:(stop + 7) // 8 + margin]
+        local[:piece.size] = piece
+        # Cửa sổ 64 bit big-endian bắt đầu tại mỗi byte, đổi sẵn sang uint64 để tra nhanh
+        windows = np.ndarray((local.size - 7,), dtype='>u8', buffer=local, strides=(1,)).astype(np.uint64)
+
+        seg_starts = np.arange(start - base, stop - base, _SEGMENT_BITS, dtype=np.int64)
+        seg_ends = np.append(seg_starts[1:], stop - base)
+        n = seg_starts.size
+        # Bố cục (bước, đoạn) để mỗi bước ghi liền một dòng
+        syms = np.empty((max_steps, n), dtype=np.uint16)
+        poss = np.empty((max_steps, n), dtype=np.int64)
+        counts = np.zeros(n, dtype=np.int64)
+        finals = np.zeros(n, dtype=np.int64)
+
+        def run(rows, begin):
+            # Đoạn đã qua điểm kết thúc vẫn giải mã tiếp (rẻ hơn che mặt nạ từng bước),
+            # số symbol hợp lệ được đếm lại từ poss ở cuối
+            pos = begin.copy()
+            end = seg_ends[rows]
+            for k in range(max_steps):
+                entry = table.lookup(windows.take(pos >> 3) << (pos & 7).view(np.uint64))
+                syms[k, rows] = entry
+                poss[k, rows] = pos
+                pos += entry & length_mask
+                if k % 8 == 7 and (pos >= end).all():
+                    break
+            taken = (poss[:k + 1, rows] < end).sum(axis=0)
+            cols = np.arange(n)[rows]
+            last = np.maximum(taken, 1) - 1
+            counts[rows] = taken
+            finals[rows] = np.where(taken > 0, poss[last, cols] + (syms[last, cols] & length_mask), begin)
+
+        run(slice(None), seg_starts)
+        # Chỉ cần kiểm tra lại những đoạn có đoạn đứng trước vừa đổi vị trí kết thúc
+        skip = np.zeros(n, dtype=np.int64)
+        check = np.arange(1, n)
+        # Số đoạn đã giải mã lại (mỗi lượt tính thêm n/8 cho chi phí cố định của lượt đó);
+        # _chain_starts tốn khoảng max_len lượt trên cả n đoạn
+        work = 0
+        while check.size:
+            need = finals[check - 1]
+            hit = (poss[:sync_steps, check] == need) & (steps[:sync_steps] < counts[check])
+            found = hit.any(axis=0)
+            skip[check] = hit.argmax(axis=0)
+            bad = check[~found]
+            if not bad.size:
+                break
+            work += bad.size + n // 8
+            if work > table.max_len * n:
+                # Giải mã lại từng đợt không hội tụ (mã không tự đồng bộ): tính thẳng vị trí đúng
+                run(slice(None), _chain_starts(run, finals, seg_starts, table.max_len))
+                skip[:] = 0
+                break
+            run(bad, finals[bad - 1])
+            check = bad[bad + 1 < n] + 1
+
+        valid = (steps >= skip) & (steps < counts)
+        chunk = syms.T[valid.T] >> np.uint16(6)
+        if chunk.size and not chunk.all():
+            raise ValueError("Invalid Huffman code in data")
+        take = min(chunk.size, count - done)
+        out[done:done + take] = chunk[:take] - 1
+        done += take
+        if progress:
+            progress(done, count)
+        start = base + int(finals[-1])
+
+    if done != count:
+        raise ValueError(f"Decoded data length mismatch: {done} vs {count}")
+    return out
+
+
+def _chain_starts(run, finals: np.ndarray, seg_starts: np.ndarray, max_len: int) -> np.ndarray:
+    """Vị trí bắt đầu đúng của mọi đoạn khi các đoạn không tự đồng bộ.
+
+    Mã cuối của đoạn i-1 kết thúc trong max_len bit đầu của đoạn i, nên chỉ cần giải mã mọi
+    đoạn từ từng độ lệch đó (max_len lượt song song) rồi nối điểm kết thúc tuần tự theo đoạn.
+    """
+    ends = np.empty((max_len, seg_starts.size), dtype=np.int64)
+    for offset in range(max_len):
+        run(slice(None), seg_starts + offset)
+        ends[offset] = finals
+    ends = ends.tolist()
+    bounds = seg_starts.tolist()
+    starts = [bounds[0]]
+    for i in range(1, len(bounds)):
+        offset = ends[starts[-1] - bounds[i - 1]][i - 1] - bounds[i]
+        if not 0 <= offset < max_len:
+            raise ValueError("Invalid Huffman code in data")
+        starts.append(bounds[i] + offset)
+    return np.array(starts, dtype=np.int64)
+
+
+def _sync_interval(count: int) -> int:
+    """Khoảng cách điểm đồng bộ; ảnh nhỏ hơn dùng nhóm ngắn hơn để vẫn đủ đoạn giải mã song
+    song, nhưng không ngắn hơn _MIN_SYNC_INTERVAL."""
+    return min(_SYNC_INTERVAL, max(_MIN_SYNC_INTERVAL, 1 << (count >> 10).bit_length()))
+
+
+def _index_size(count: int) -> int:
+    """Số byte chỉ mục điểm đồng bộ mà encode() ghi cho `count` symbol."""
+    return 2 * (-(-count // _sync_interval(count)) - 1)
+
+
+def _unpack_indexed(data, padding: int, aligned: np.ndarray, lengths: np.ndarray, count: int,
+                    interval: int, group_bits: np.ndarray, progress=None) -> np.ndarray:
+    """Giải mã `count` symbol khi metadata có chỉ mục điểm đồng bộ.
+
+    Mỗi nhóm `interval` symbol bắt đầu tại vị trí bit biết trước nên mọi nhóm được giải mã
+    đồng thời, đúng `interval` bước tra bảng, không phải đoán điểm đồng bộ như
+    _unpack_codes (mã sinh ra từ ảnh đã lọc thường gần như không tự đồng bộ).
+    """
+    out = np.empty(count, dtype=np.uint8)
+    if count == 0:
+        return out
+    if not lengths.any():
+        raise ValueError("Empty Huffman code table")
+
+    table = _DecodeTable(aligned, lengths)
+    raw = np.frombuffer(data, dtype=np.uint8)
+    nbits = raw.size * 8 - padding
+    n = -(-count // interval)
+    starts = np.empty(n + 1, dtype=np.int64)
+    starts[0] = 0
+    np.cumsum(group_bits, out=starts[1:n])
+    starts[n] = nbits
+    if starts[n - 1] > nbits:
+        raise ValueError("Huffman sync index exceeds data")
+
+    lanes = max(1, _DECODE_CELLS // interval)
+    # Nhóm cuối ngắn hơn interval nên giải mã thừa tối đa interval mã sau điểm kết thúc
+    margin = (interval * table.max_len + 7) // 8 + 16
+    length_mask = np.uint16(63)
+    for first in range(0, n, lanes):
+        last = min(first + lanes, n)
+        base = int(starts[first]) & ~7
+        stop = int(starts[last])
+        local = np.zeros((stop - base + 7) // 8 + margin, dtype=np.uint8)
+        piece = raw[base // 8:(stop + 7) // 8]
+        local[:piece.size] = piece
+        windows = np.ndarray((local.size - 7,), dtype='>u8', buffer=local, strides=(1,)).astype(np.uint64)
+
+        pos = starts[first:last] - base
+        syms = np.empty((interval, last - first), dtype=np.uint16)
+        for k in range(interval):
+            entry = table.lookup(windows.take(pos >> 3) << (pos & 7).view(np.uint64))
+            syms[k] = entry
+            pos += entry & length_mask
+
+        # Mỗi nhóm đủ interval symbol phải kết thúc đúng tại điểm đồng bộ kế tiếp
+        full = min(last, n - 1) - first
+        if not np.array_equal(pos[:full], starts[first + 1:first + 1 + full] - base):
+            raise ValueError("Huffman data does not match sync index")
+        lo, hi = first * interval, min(last * interval, count)
+        chunk = syms.T.ravel()[:hi - lo] >> np.uint16(6)
+        if not chunk.all():
+            raise ValueError("Invalid Huffman code in data")
+        out[lo:hi] = chunk - 1
+        if progress:
+            progress(hi, count)
+    return out
 
 
 class HuffmanCompressor(Compressor):
-    def _build_tree(self, freq):
-        if not freq:
-            return None
-        heap = [Node(v, f) for v, f in freq.items() if f > 0]
-        if len(heap) == 0:
-            return None
-        heapq.heapify(heap)
-        while len(heap) > 1:
-            left = heapq.heappop(heap)
-            right = heapq.heappop(heap)
-            merged = Node(None, left.freq + right.freq, left, right)
-            heapq.heappush(heap, merged)
-        return heap[0]
+    def __init__(self, shared_table: bool = False, transform=None, dictionary=None):
+        super().__init__(transform)
+        # shared_table: khi nén theo dải, mọi dải dùng chung bảng mã dựng từ histogram toàn ảnh
+        self.shared_table = shared_table
+        # dictionary: HuffmanDictionary (core.dictionary) dùng để nén mọi ảnh; metadata chỉ ghi
+        # ID của nó, và cần cùng từ điển đó khi giải nén
+        self.dictionary = dictionary
 
     def _build_codes(self, node, current_code="", codes=None):
         if codes is None:
@@ -44,46 +510,50 @@ class HuffmanCompressor(Compressor):
         self._build_codes(node.right, current_code + "1", codes)
         return codes
 
-    def encode(self, img: np.ndarray) -> tuple[bytes, bytes]:
-        flat = img.flatten()
+    def _stream_params(self, img: np.ndarray, block_rows: int, block_cols: int) -> dict:
+        """Histogram toàn ảnh (đọc lần lượt từng khối) -> độ dài mã dùng chung cho mọi khối."""
+        if not self.shared_table or self.dictionary is not None:
+            return {}
+        counts = np.zeros(256, dtype=np.int64)
+        for block in self._blocks(img, block_rows, block_cols):
+            counts += _histogram(np.ravel(self._forward(block)[0]))
+        if not counts.any():
+            return {}
+        return {'lengths': _code_lengths(counts)}
+
+    def encode(self, img: np.ndarray, lengths: np.ndarray = None, progress=None) -> tuple[bytes, bytes]:
+        """lengths: bảng độ dài mã có sẵn (phải phủ mọi giá trị cần mã hóa); mặc định dựng từ img
+        hoặc lấy từ self.dictionary."""
+        filtered, transform = self._forward(img)
+        flat = np.ravel(filtered)
         if len(flat) == 0:
             return b'', b''
 
-        freq = Counter(flat)
-        tree = self._build_tree(freq)
-        if tree is None:
-            return b'', b''
-
-        codes = self._build_codes(tree)
-        bit_string = ''.join(codes.get(pixel, '') for pixel in flat)
-
-        # Padding to byte boundary
-        padding = (8 - len(bit_string) % 8) % 8
-        bit_string += '0' * padding
-
-        # Convert to bytes
-        byte_data = bytes(int(bit_string[i:i + 8], 2) for i in range(0, len(bit_string), 8))
-
-        # Serialize tree: pre-order traversal with value or (left, right)
-        tree_bytes = self._serialize_tree(tree)
-        # Metadata structure: padding (1 byte) + tree_len (4 bytes) + tree_bytes
-        metadata = struct.pack('<B', padding) + struct.pack('<I', len(tree_bytes)) + tree_bytes
-        return byte_data, metadata
-
-    def _serialize_tree(self, node) -> bytes:
-        if node is None:
-            return b''
-        buf = io.BytesIO()
-        if node.val is not None:
-            # Leaf: 1 byte flag (1) + 1 byte value
-            buf.write(b'\x01')
-            buf.write(bytes([node.val]))
+        flag = 0
+        if lengths is None and self.dictionary is not None:
+            lengths, aligned = self.dictionary.lengths, self.dictionary.codes
+            table, flag = struct.pack('<I', self.dictionary.id), _DICTIONARY_FLAG
         else:
-            # Internal: 0 byte flag + left + right
-            buf.write(b'\x00')
-            buf.write(self._serialize_tree(node.left))
-            buf.write(self._serialize_tree(node.right))
-        return buf.getvalue()
+            if lengths is None:
+                with stage("histogram"):
+                    counts = _histogram(flat)
+                with stage("table"):
+                    lengths = _code_lengths(counts)
+            with stage("table"):
+                aligned = _canonical_codes(lengths)
+                table = _pack_lengths(lengths)
+        interval = _sync_interval(len(flat))
+        with stage("pack"):
+            byte_data, padding, group_bits = _pack_codes(flat, aligned, lengths, progress, interval)
+        count("symbols", flat.size)
+        count("encoded_bytes", len(byte_data))
+
+        # Metadata structure: padding (1 byte) + 256 code lengths (4 bit each) + sync interval
+        # (uint16) + số bit của mọi nhóm trừ nhóm cuối (uint16 mỗi nhóm) + transform header.
+        # Với từ điển: padding | _DICTIONARY_FLAG, rồi ID từ điển (uint32) thay cho bảng độ dài.
+        index = group_bits[:-1].astype('<u2').tobytes()
+        metadata = struct.pack('<B', padding | flag) + table + struct.pack('<H', interval) + index + transform
+        return byte_data, metadata
 
     def _deserialize_tree(self, data: bytes, pos: int = 0) -> tuple[Node, int]:
         if pos >= len(data):
@@ -103,7 +573,53 @@ class HuffmanCompressor(Compressor):
         else:
             raise ValueError(f"Invalid node flag: {flag}")
 
-    def decode(self, data: bytes, metadata: bytes, shape: tuple) -> np.ndarray:
+    def decode(self, data: bytes, metadata: bytes, shape: tuple, progress=None) -> np.ndarray:
+        if not metadata:
+            return np.zeros(shape, dtype=np.uint8)
+        padding = metadata[0] & ~_DICTIONARY_FLAG
+        dictionary = metadata[0] & _DICTIONARY_FLAG
+        if dictionary:
+            lengths, aligned = self._dictionary_table(metadata)
+            pos = 5
+        else:
+            if len(metadata) < 1 + _LENGTHS_SIZE:
+                raise ValueError("Invalid Huffman metadata")
+            with stage("table"):
+                lengths = _unpack_lengths(metadata[1:1 + _LENGTHS_SIZE])
+                aligned = _canonical_codes(lengths)
+            pos = 1 + _LENGTHS_SIZE
+        total = int(np.prod(shape))
+        count("encoded_bytes", len(data))
+        if not dictionary and len(metadata) == pos:
+            # Metadata v2: không có chỉ mục điểm đồng bộ
+            with stage("unpack"):
+                return _unpack_codes(data, padding, aligned, lengths, total, progress).reshape(shape)
+
+        if len(metadata) < pos + 2:
+            raise ValueError("Invalid Huffman metadata")
+        interval = struct.unpack_from('<H', metadata, pos)[0]
+        if not 0 < interval <= _SYNC_INTERVAL:
+            raise ValueError(f"Invalid Huffman sync interval: {interval}")
+        pos += 2
+        index_size = 2 * (-(-total // interval) - 1)
+        if len(metadata) < pos + index_size:
+            raise ValueError("Incomplete Huffman sync index")
+        group_bits = np.frombuffer(metadata, dtype='<u2', count=index_size // 2, offset=pos)
+        with stage("unpack"):
+            decoded = _unpack_indexed(data, padding, aligned, lengths, total, interval, group_bits, progress)
+        return self._inverse(decoded, shape, metadata[pos + index_size:])
+
+    def _dictionary_table(self, metadata) -> tuple[np.ndarray, np.ndarray]:
+        """(độ dài, mã) của từ điển mà metadata tham chiếu; lỗi nếu chưa nạp đúng từ điển."""
+        if len(metadata) < 5:
+            raise ValueError("Invalid Huffman metadata")
+        dict_id = struct.unpack_from('<I', metadata, 1)[0]
+        if self.dictionary is None or self.dictionary.id != dict_id:
+            raise ValueError(f"Huffman dictionary {dict_id:08x} is required to decode this data")
+        return self.dictionary.lengths, self.dictionary.codes
+
+    def _decode_tree(self, data: bytes, metadata: bytes, shape: tuple) -> np.ndarray:
+        """Giải mã dữ liệu định dạng v1 (metadata chứa cây Huffman tuần tự hóa)."""
         if not metadata:
             return np.zeros(shape, dtype=np.uint8)
 
@@ -123,81 +639,29 @@ class HuffmanCompressor(Compressor):
         # Build tree
         root, _ = self._deserialize_tree(tree_bytes)
 
-        # Build bit string from data
-        bit_string = ''.join(format(b, '08b') for b in data)
-        if padding > 0:
-            bit_string = bit_string[:-padding]
-
-        # Traverse tree to decode
-        decoded = []
-        node = root
-        total_pixels = np.prod(shape)
-        for bit in bit_string:
-            if node is None:
-                raise ValueError("Huffman tree traversal failed unexpectedly")
-            if bit == '0':
-                node = node.left
-            else:
-                node = node.right
-
-            if node is not None and node.val is not None:
-                decoded.append(node.val)
-                node = root
-                if len(decoded) == total_pixels:
-                    break
-            elif node is None:
-                # Trường hợp cây chỉ có 1 nút (chỉ có 1 giá trị pixel)
-                # Xử lý: nếu chỉ có 1 pixel, logic này có thể bị lỗi nếu bit_string rỗng.
-                # Tuy nhiên, encode đã xử lý: nếu len(flat)==0 trả về b'',b''
-                # Ta chấp nhận decode trả về mảng 0 nếu metadata rỗng.
-                # Với dữ liệu 3 kênh (RGB) luôn có > 1 giá trị, nên ít khả năng xảy ra.
-                break
-
-        # Kiểm tra nếu decode bị dừng vì node là None
-        if len(decoded) != total_pixels:
-            # Cho phép nếu mảng rỗng (total_pixels = 0)
-            if total_pixels != 0:
-                # Điều chỉnh kiểm tra: nếu ta decode đủ số pixel thì không cần lo lắng về các bit dư
-                pass
-
-        if len(decoded) != total_pixels:
-            raise ValueError(f"Decoded data length mismatch: {len(decoded)} vs {total_pixels}")
+        total_pixels = int(np.prod(shape))
+        if root is not None and root.val is not None:
+            # Cây chỉ có 1 lá (ảnh một màu): mã rỗng, không có bit dữ liệu
+            return np.full(shape, root.val, dtype=np.uint8)
 
-        return np.array(decoded, dtype=np.uint8).reshape(shape)
+        aligned, lengths = _code_table(self._build_codes(root))
+        decoded = _unpack_codes(data, padding, aligned, lengths, total_pixels)
+        return decoded.reshape(shape)
 
     def save_file(self, path: str, data: bytes, metadata: bytes, shape: tuple):
-        h, w, c = shape
-        with open(path, 'wb') as f:
-            f.write(b'HUFF')
-            f.write(struct.pack('<III', h, w, c))
-            f.write(metadata)
-            f.write(data)
+        write_file(path, self.name, shape, metadata, data)
 
     def load_file(self, path: str) -> np.ndarray:
-        with open(path, 'rb') as f:
-            if f.read(4) != b'HUFF':
-                raise ValueError("Invalid .huff file")
-            h, w, c = struct.unpack('<III', f.read(12))
-
-            # Sửa lỗi: Đọc padding (1 byte)
-            padding = f.read(1)
-            if len(padding) < 1:
-                raise ValueError("Incomplete .huff file: missing padding")
-
-            # Sửa lỗi: Đọc tree_len (4 bytes)
-            tree_len_bytes = f.read(4)
-            if len(tree_len_bytes) < 4:
-                raise ValueError("Incomplete .huff file: missing tree length")
-            tree_len = struct.unpack('<I', tree_len_bytes)[0]
-
-            # Sửa lỗi: Đọc tree_bytes (tree_len bytes)
-            tree_bytes = f.read(tree_len)
-
-            # Metadata = padding + tree_len_bytes + tree_bytes
-            metadata = padding + tree_len_bytes + tree_bytes
-
-            data = f.read()
-            return self.decode(data, metadata, (h, w, c))
+        with map_file(path) as buf:
+            return self.from_bytes(buf)
+
+    def from_bytes(self, buf) -> np.ndarray:
+        """Giải nén nội dung file .huff; buf (bytes/memoryview/mmap) không bị chép lại."""
+        header = read_header(buf, self.name, ".huff")
+        if header.version == 1:
+            # Metadata v1 = padding + tree_len + cây Huffman tuần tự hóa
+            return self._decode_tree(header.data, bytes(header.metadata), header.shape)
+        return self.decode(header.data, bytes(header.metadata), header.shape)
 
     @property
     def name(self) -> str:
@@ -0,0 +1,173 @@
+# core/hybrid.py
+"""
+Bộ nén lai: chia ảnh thành các ô và chọn cho từng ô cách lưu rẻ nhất trong RLE, Huffman và
+lưu thô. Kích thước mỗi cách được ước lượng từ thống kê rẻ (số run, histogram -> entropy)
+thay vì nén thử, nên ảnh chụp màn hình có cả vùng phẳng lẫn vùng ảnh chụp đều nén tốt.
+
+Metadata: block_h, block_w (uint16) | header transform
+Dữ liệu : với mỗi ô (mặt phẳng, hàng trước): tag (1B) | độ dài payload (uint32) | payload
+          payload Huffman = độ dài metadata (uint32) | metadata | dữ liệu
+"""
+import math
+import struct
+
+import numpy as np
+
+from .compressor import Compressor
+from .container import block_bounds, block_grid
+from .fileformat import read_header, write_file
+from .filters import layout
+from .huffman import HuffmanCompressor, _LENGTHS_SIZE, _index_size
+from .profiling import stage
+from .rle import RLECompressor
+from .utils import map_file
+
+DEFAULT_BLOCK_SIZE = 64
+
+RAW, RLE, HUFFMAN = 0, 1, 2
+TAG_NAMES = ("raw", "rle", "huffman")
+
+_BLOCK_HEADER = struct.Struct("<BI")
+# Metadata Huffman của một ô: padding + bảng độ dài mã + khoảng cách điểm đồng bộ (+ chỉ mục)
+_HUFFMAN_META_MIN = 1 + _LENGTHS_SIZE + 2
+
+
+def estimate_costs(block: np.ndarray) -> tuple[int, int, int]:
+    """Ước lượng số byte khi lưu block (mảng uint8 1 chiều) dạng thô, RLE và Huffman.
+
+    RLE: 2 byte cho mỗi run (run dài hơn 255 bị tách). Huffman: entropy của histogram
+    (tối thiểu 1 bit mỗi symbol) cộng bảng độ dài mã và chỉ mục điểm đồng bộ.
+    """
+    n = block.size
+    runs = int(np.count_nonzero(block[1:] != block[:-1])) + 1
+    rle = 2 * max(runs, -(-n // 255))
+
+    counts = np.bincount(block, minlength=256)
+    counts = counts[counts > 0].astype(np.float64)
+    bits = n * math.log2(n) - float(np.dot(counts, np.log2(counts)))
+    huffman = (max(bits, n) + 7) // 8 + 4 + _HUFFMAN_META_MIN + _index_size(n)
+    return n, rle, int(huffman)
+
+
+class HybridCompressor(Compressor):
+    def __init__(self, block_size: int = DEFAULT_BLOCK_SIZE, transform=None):
+        super().__init__(transform)
+        if not 0 < block_size < 1 << 16:
+            raise ValueError(f"Invalid block size: {block_size}")
+        self.block_size = block_size
+        self._rle = RLECompressor()
+        self._huffman = HuffmanCompressor()
+
+    def _tiles(self, dims: tuple, block_shape: tuple):
+        """(mặt phẳng, y0, y1, x0, x1) của mọi ô theo thứ tự lưu."""
+        planes, h, w, _ = dims
+        blocks = int(np.prod(block_grid((h, w), block_shape)))
+        for p in range(planes):
+            for i in range(blocks):
+                yield (p, *block_bounds((h, w), block_shape, i))
+
+    def encode(self, img: np.ndarray, progress=None):
+        filtered, transform = self._forward(img)
+        x = filtered.reshape(layout(img.shape, transform))
+        block_shape = (self.block_size, self.block_size)
+        pieces = []
+        done = 0
+        for p, y0, y1, x0, x1 in self._tiles(x.shape, block_shape):
+            block = np.ravel(x[p, y0:y1, x0:x1])
+            if block.size == 0:
+                continue
+            with stage("estimate"):
+                costs = estimate_costs(block)
+            tag = costs.index(min(costs))
+            if tag == RLE:
+                payload = self._rle.encode(block)[0]
+            elif tag == HUFFMAN:
+                data, meta = self._huffman.encode(block)
+                payload = struct.pack("<I", len(meta)) + meta + data
+            else:
+                payload = block.tobytes()
+            pieces += [_BLOCK_HEADER.pack(tag, len(payload)), payload]
+            done += block.size
+            if progress:
+                progress(done, x.size)
+        metadata = struct.pack("<HH", *block_shape) + transform
+        return b"".join(pieces), metadata
+
+    def decode(self, data: bytes, metadata, shape, progress=None):
+        if len(metadata) < 4:
+            raise ValueError("Invalid hybrid metadata")
+        block_shape = struct.unpack_from("<HH", metadata)
+        if 0 in block_shape:
+            raise ValueError("Invalid hybrid block size")
+        transform = bytes(metadata[4:])
+        dims = layout(shape, transform)
+        out = np.empty(dims, dtype=np.uint8)
+        total = out.size
+        buf = memoryview(data)
+        pos = done = 0
+        for p, y0, y1, x0, x1 in self._tiles(dims, block_shape):
+            n = (y1 - y0) * (x1 - x0) * dims[3]
+            if n == 0:
+                continue
+            if pos + _BLOCK_HEADER.size > len(buf):
+                raise ValueError("Incomplete hybrid data: missing block")
+            tag, size = _BLOCK_HEADER.unpack_from(buf, pos)
+            pos += _BLOCK_HEADER.size
+            payload = buf[pos:pos + size]
+            if len(payload) < size:
+                raise ValueError("Incomplete hybrid data: truncated block")
+            pos += size
+
+            if tag == RAW:
+                if size != n:
+                    raise ValueError("Raw block size mismatch")
+                block = np.frombuffer(payload, dtype=np.uint8)
+            elif tag == RLE:
+                block = self._rle.decode(payload, None, (n,))
+            elif tag == HUFFMAN:
+                meta_len = struct.unpack_from("<I", payload)[0] if size >= 4 else 0
+                if size < 4 or 4 + meta_len > size:
+                    raise ValueError("Incomplete hybrid data: truncated Huffman block")
+                # Ô Huffman luôn có chỉ mục điểm đồng bộ nên không bao giờ rơi vào đường giải
+                # mã tự đồng bộ (_unpack_codes), vốn rất chậm với mã không tự đồng bộ
+                if meta_len < _HUFFMAN_META_MIN:
+                    raise ValueError("Hybrid Huffman block has no sync index")
+                block = self._huffman.decode(payload[4 + meta_len:], bytes(payload[4:4 + meta_len]), (n,))
+            else:
+                raise ValueError(f"Unknown hybrid block tag: {tag}")
+            out[p, y0:y1, x0:x1] = block.reshape(y1 - y0, x1 - x0, dims[3])
+            done += n
+            if progress:
+                progress(done, total)
+        if pos != len(buf):
+            raise ValueError("Trailing data after last hybrid block")
+        return self._inverse(out.ravel(), shape, transform)
+
+    def block_tags(self, data: bytes) -> dict:
+        """Đếm số ô theo cách lưu (raw/rle/huffman) trong dữ liệu do encode() trả về."""
+        stats = dict.fromkeys(TAG_NAMES, 0)
+        buf = memoryview(data)
+        pos = 0
+        while pos < len(buf):
+            tag, size = _BLOCK_HEADER.unpack_from(buf, pos)
+            if tag >= len(TAG_NAMES):
+                raise ValueError(f"Unknown hybrid block tag: {tag}")
+            stats[TAG_NAMES[tag]] += 1
+            pos += _BLOCK_HEADER.size + size
+        return stats
+
+    def save_file(self, path: str, data: bytes, metadata, shape):
+        write_file(path, self.name, shape, metadata, data)
+
+    def load_file(self, path: str):
+        with map_file(path) as buf:
+            return self.from_bytes(buf)
+
+    def from_bytes(self, buf):
+        """Giải nén nội dung file .hyb; buf (bytes/memoryview/mmap) không bị chép lại."""
+        header = read_header(buf, self.name, ".hyb")
+        return self.decode(header.data, bytes(header.metadata), header.shape)
+
+    @property
+    def name(self):
+        return "Hybrid"
@@ -0,0 +1,134 @@
+# core/metrics.py
+"""
+Chỉ số chất lượng ảnh tái tạo (MSE/PSNR/SSIM) cho ảnh uint8 h x w x c.
+
+Ảnh được xử lý theo từng dải hàng với bộ cộng dồn số nguyên nên bộ nhớ tạm chỉ phụ thuộc
+kích thước một dải (không chuyển cả ảnh sang float64), và tổng bình phương sai số là chính
+xác. is_lossless() dừng ngay ở dải đầu tiên khác nhau.
+"""
+import numpy as np
+
+# Số mẫu (pixel x kênh) xử lý mỗi lượt
+_CHUNK = 1 << 22
+PEAK = 255
+
+
+def _check(orig: np.ndarray, rec: np.ndarray):
+    if orig.shape != rec.shape:
+        raise ValueError(f"Shape mismatch: {orig.shape} vs {rec.shape}")
+
+
+def _bands(shape: tuple, rows: int = None):
+    """Các khoảng hàng [y0, y1) sao cho mỗi dải có khoảng _CHUNK mẫu (hoặc `rows` hàng)."""
+    h = shape[0]
+    rows = rows or max(1, _CHUNK // max(1, int(np.prod(shape[1:]))))
+    for y in range(0, h, rows):
+        yield y, min(y + rows, h)
+
+
+def _squared_error(orig: np.ndarray, rec: np.ndarray) -> np.ndarray:
+    d = orig.astype(np.int32) - rec
+    return d * d
+
+
+def psnr_from_mse(mse: float, peak: int = PEAK) -> float:
+    return float('inf') if mse == 0 else float(10 * np.log10(peak ** 2 / mse))
+
+
+def channel_sse(orig: np.ndarray, rec: np.ndarray) -> np.ndarray:
+    """Tổng bình phương sai số (int64, chính xác) của từng kênh."""
+    _check(orig, rec)
+    c = orig.shape[2]
+    sse = np.zeros(c, dtype=np.int64)
+    for y0, y1 in _bands(orig.shape):
+        sse += _squared_error(orig[y0:y1], rec[y0:y1]).reshape(-1, c).sum(axis=0, dtype=np.int64)
+    return sse
+
+
+def mse_psnr(orig: np.ndarray, rec: np.ndarray) -> tuple[float, float]:
+    """(MSE, PSNR) của toàn ảnh; PSNR = inf khi hai ảnh trùng nhau."""
+    if orig.size == 0:
+        _check(orig, rec)
+        return 0.0, float('inf')
+    mse = int(channel_sse(orig, rec).sum()) / orig.size
+    return mse, psnr_from_mse(mse)
+
+
+def channel_mse_psnr(orig: np.ndarray, rec: np.ndarray) -> list[tuple[float, float]]:
+    """[(MSE, PSNR)] cho từng kênh."""
+    pixels = orig.shape[0] * orig.shape[1]
+    if pixels == 0:
+        _check(orig, rec)
+        return [(0.0, float('inf'))] * orig.shape[2]
+    return [(mse, psnr_from_mse(mse)) for mse in (channel_sse(orig, rec) / pixels).tolist()]
+
+
+def tile_mse_psnr(orig: np.ndarray, rec: np.ndarray, tile: int = 256) -> tuple[np.ndarray, np.ndarray]:
+    """MSE và PSNR của từng ô tile x tile (mảng ty x tx), để tìm vùng sai lệch."""
+    _check(orig, rec)
+    h, w = orig.shape[:2]
+    ty, tx = -(-h // tile), -(-w // tile)
+    sse = np.zeros((ty, tx), dtype=np.int64)
+    cols = np.arange(0, w, tile)
+    # Mỗi dải là bội của tile hàng để không ô nào bị cắt giữa hai dải
+    rows = tile * max(1, _CHUNK // max(1, tile * w * orig.shape[2]))
+    for y0, y1 in _bands(orig.shape, rows):
+        err = _squared_error(orig[y0:y1], rec[y0:y1]).sum(axis=2, dtype=np.int64)
+        if w:
+            per_row = np.add.reduceat(err, cols, axis=1)
+            sse[y0 // tile:-(-y1 // tile)] += np.add.reduceat(per_row, np.arange(0, y1 - y0, tile), axis=0)
+
+    heights = np.minimum(tile, h - np.arange(ty) * tile)
+    widths = np.minimum(tile, w - np.arange(tx) * tile)
+    mse = sse / (np.outer(heights, widths) * orig.shape[2])
+    with np.errstate(divide='ignore'):
+        psnr = np.where(mse == 0, np.inf, 10 * np.log10(PEAK ** 2 / np.maximum(mse, 1e-300)))
+    return mse, psnr
+
+
+def is_lossless(orig: np.ndarray, rec: np.ndarray) -> bool:
+    """True nếu rec trùng từng byte với orig; so sánh theo dải và dừng ở dải khác đầu tiên."""
+    if orig.shape != rec.shape or orig.dtype != rec.dtype:
+        return False
+    return all(np.array_equal(orig[y0:y1], rec[y0:y1]) for y0, y1 in _bands(orig.shape))
+
+
+def _window_sums(v: np.ndarray, rows: np.ndarray, cols: np.ndarray, window: int) -> np.ndarray:
+    """Tổng của v trên các cửa sổ window x window có góc trên-trái tại (rows x cols), dùng cumsum."""
+    acc = np.zeros((v.shape[0] + 1,) + v.shape[1:], dtype=np.int64)
+    np.cumsum(v, axis=0, out=acc[1:])
+    band = acc[rows + window] - acc[rows]
+    acc = np.zeros((band.shape[0], band.shape[1] + 1, band.shape[2]), dtype=np.int64)
+    np.cumsum(band, axis=1, out=acc[:, 1:])
+    return acc[:, cols + window] - acc[:, cols]
+
+
+def ssim(orig: np.ndarray, rec: np.ndarray, window: int = 8, stride: int = 4) -> float:
+    """SSIM trung bình trên các cửa sổ vuông window x window cách nhau stride pixel.
+
+    Dùng cửa sổ đều (không Gauss) và trung bình mọi kênh; thống kê của mỗi cửa sổ tính từ
+    tổng số nguyên (cumsum) trên một dải hàng nên không cần giữ cả ảnh dạng float.
+    """
+    _check(orig, rec)
+    h, w, c = orig.shape
+    window = min(window, h, w)
+    if window == 0:
+        return 1.0
+    c1, c2 = (0.01 * PEAK) ** 2, (0.03 * PEAK) ** 2
+    n = window * window
+    starts = np.arange(0, h - window + 1, stride)
+    cols = np.arange(0, w - window + 1, stride)
+    per_band = max(1, (_CHUNK >> 3) // max(1, stride * w * c))
+    total, count = 0.0, 0
+    for i in range(0, starts.size, per_band):
+        rows = starts[i:i + per_band]
+        y0, y1 = int(rows[0]), int(rows[-1]) + window
+        x = orig[y0:y1].astype(np.int64)
+        y = rec[y0:y1].astype(np.int64)
+        mx, my, sxx, syy, sxy = (_window_sums(v, rows - y0, cols, window) / n
+                                 for v in (x, y, x * x, y * y, x * y))
+        vx, vy, cov = sxx - mx * mx, syy - my * my, sxy - mx * my
+        s = ((2 * mx * my + c1) * (2 * cov + c2)) / ((mx * mx + my * my + c1) * (vx + vy + c2))
+        total += float(s.sum())
+        count += s.size
+    return total / count
@@ -0,0 +1,102 @@
+# core/profiling.py
+"""
+Đo thời gian theo từng giai đoạn (histogram, dựng bảng mã, đóng gói bit, I/O...), đếm byte và
+bộ nhớ đỉnh của một lần encode/decode/save/load.
+
+Các codec đánh dấu giai đoạn bằng `with stage("tên"):` và đếm byte bằng `count("tên", n)`;
+khi không có phiên đo nào đang chạy (mặc định) hai hàm này gần như không tốn gì. Phiên đo
+gắn với context hiện tại (contextvars) nên các luồng khác dùng chung compressor không bị
+tính lẫn.
+
+    (data, meta), stats = comp.profile("encode", img, memory=True)
+    print(stats.stages)          # {'transform': 0.01, 'histogram': 0.02, ...} (giây)
+    stats.save_json("encode.json")
+"""
+import contextvars
+import cProfile
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+_active = contextvars.ContextVar("profiling_stats", default=None)
+
+
+class Stats:
+    """Kết quả một phiên đo: thời gian và số lần gọi từng giai đoạn, bộ đếm byte, bộ nhớ đỉnh."""
+
+    def __init__(self, operation: str = ""):
+        self.operation = operation
+        self.total = 0.0
+        self.stages = {}
+        self.calls = {}
+        self.counters = {}
+        self.peak_bytes = None
+
+    def to_dict(self) -> dict:
+        return {"operation": self.operation, "total_s": round(self.total, 6),
+                "stages_s": {k: round(v, 6) for k, v in self.stages.items()},
+                "calls": dict(self.calls), "counters": dict(self.counters),
+                "peak_mb": None if self.peak_bytes is None else round(self.peak_bytes / 1e6, 3)}
+
+    def save_json(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=1, ensure_ascii=False)
+
+    def __repr__(self) -> str:
+        stages = ", ".join(f"{k}={v * 1000:.1f}ms" for k, v in self.stages.items())
+        return f"Stats({self.operation} {self.total * 1000:.1f}ms: {stages})"
+
+
+@contextmanager
+def stage(name: str):
+    """Cộng thời gian chạy khối lệnh vào giai đoạn `name` của phiên đo hiện tại (nếu có)."""
+    stats = _active.get()
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.stages[name] = stats.stages.get(name, 0.0) + time.perf_counter() - start
+        stats.calls[name] = stats.calls.get(name, 0) + 1
+
+
+def count(name: str, n: int):
+    """Cộng n vào bộ đếm `name` (ví dụ số byte đọc/ghi) của phiên đo hiện tại (nếu có)."""
+    stats = _active.get()
+    if stats is not None:
+        stats.counters[name] = stats.counters.get(name, 0) + int(n)
+
+
+def profile(fn, *args, memory: bool = False, cprofile: str = None, operation: str = None, **kwargs):
+    """
+    Gọi fn(*args, **kwargs) trong một phiên đo, trả về (kết quả, Stats).
+    memory=True: đo bộ nhớ đỉnh bằng tracemalloc (chậm hơn); cprofile: đường dẫn ghi file
+    cProfile (.prof, xem bằng pstats/snakeviz).
+    """
+    stats = Stats(operation or getattr(fn, "__name__", ""))
+    token = _active.set(stats)
+    tracing = memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    elif memory:
+        tracemalloc.reset_peak()
+    profiler = cProfile.Profile() if cprofile else None
+    start = time.perf_counter()
+    try:
+        if profiler:
+            result = profiler.runcall(fn, *args, **kwargs)
+        else:
+            result = fn(*args, **kwargs)
+    finally:
+        stats.total = time.perf_counter() - start
+        if memory:
+            stats.peak_bytes = tracemalloc.get_traced_memory()[1]
+        if tracing:
+            tracemalloc.stop()
+        _active.reset(token)
+        if profiler:
+            profiler.dump_stats(cprofile)
+    return result, stats
@@ -0,0 +1,289 @@
+# core/rans.py
+"""
+Bộ nén entropy rANS (range Asymmetric Numeral Systems) xen kẽ nhiều trạng thái.
+
+Khác Huffman (mỗi symbol tốn số bit nguyên), rANS tốn xấp xỉ -log2(p) bit nên thắng rõ khi
+histogram lệch mạnh, ví dụ phần dư sau bộ dự đoán với một giá trị chiếm đa số. Dữ liệu được
+chia thành `lanes` đoạn liền nhau, mỗi đoạn có một trạng thái rANS riêng; mỗi bước mã hóa /
+giải mã một symbol của mọi đoạn cùng lúc bằng NumPy, nên vòng lặp Python chỉ chạy
+n / lanes lần.
+
+order=1: bảng tần suất theo ngữ cảnh (symbol liền trước trong cùng đoạn); nếu ước lượng
+kích thước (gồm cả bảng) không nhỏ hơn order 0 thì tự dùng order 0.
+
+Metadata: order (1B) | lanes (uint32) | bảng tần suất | header transform
+Dữ liệu : trạng thái cuối của từng đoạn (uint32) | các word renormalize (uint16)
+Bảng tần suất: với order 1 là bitmap 256 bit các ngữ cảnh có mặt rồi tới bảng của từng ngữ
+cảnh; mỗi bảng = bitmap 256 bit các symbol có mặt + tần suất (uint16, tổng = 1 << PROB_BITS[order]).
+"""
+import struct
+
+import numpy as np
+
+from .compressor import Compressor
+from .fileformat import read_header, write_file
+from .profiling import count, stage
+from .utils import map_file
+
+# Độ chính xác xác suất theo order: bảng order 1 (tối đa 256 ngữ cảnh) dùng ít bit hơn để
+# bảng giải mã (ngữ cảnh x 1 << bits) nhỏ và dựng nhanh
+PROB_BITS = (14, 12)
+# Trạng thái nằm trong [_RANS_L, _RANS_L << 16); mỗi lần renormalize đọc/ghi 16 bit
+_RANS_L = 1 << 16
+# Trước khi mã hóa symbol tần suất f, trạng thái phải nhỏ hơn f << (32 - bits)
+# Số symbol tối thiểu mỗi đoạn và số đoạn tối đa (mỗi đoạn tốn 4 byte trạng thái)
+_LANE_SYMBOLS = 1024
+_MAX_LANES = 4096
+_HEADER = struct.Struct('<BI')
+# Số bước (hàng của ma trận bước x đoạn) tra bảng mỗi lượt khi dựng bảng theo symbol
+_TABLE_ROWS = 64
+
+
+def _lane_count(n: int) -> int:
+    return int(min(_MAX_LANES, max(1, n // _LANE_SYMBOLS)))
+
+
+def _normalize(counts: np.ndarray, bits: int) -> np.ndarray:
+    """Lượng tử hóa từng hàng histogram về tổng 1 << bits, symbol có mặt luôn có tần suất >= 1."""
+    scale = 1 << bits
+    totals = counts.sum(axis=1, keepdims=True)
+    freq = np.where(counts > 0, np.maximum(1, (2 * counts * scale + totals) // np.maximum(2 * totals, 1)), 0)
+    for row in np.flatnonzero(totals[:, 0]).tolist():
+        f = freq[row]
+        diff = scale - int(f.sum())
+        # Dồn phần chênh vào các symbol nhiều nhất (bớt thì không để tần suất xuống dưới 1)
+        for s in np.argsort(-f, kind='stable').tolist():
+            if diff == 0:
+                break
+            step = diff if diff > 0 else max(diff, 1 - int(f[s]))
+            f[s] += step
+            diff -= step
+    return freq.astype(np.int64)
+
+
+def _by_step(values: np.ndarray, lanes: int, seg: int) -> np.ndarray:
+    """Xếp mảng theo đoạn liền nhau thành ma trận (bước, đoạn); phần thiếu ở đoạn cuối là 0."""
+    padded = np.zeros(lanes * seg, dtype=values.dtype)
+    padded[:values.size] = values
+    return np.ascontiguousarray(padded.reshape(lanes, seg).T)
+
+
+def _contexts(flat: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """Ngữ cảnh order 1 của từng symbol: symbol liền trước trong cùng đoạn (0 ở đầu đoạn)."""
+    ctx = np.empty_like(flat)
+    ctx[0] = 0
+    ctx[1:] = flat[:-1]
+    ctx[starts] = 0
+    return ctx
+
+
+def _pack_table(freq: np.ndarray, order: int) -> bytes:
+    rows = np.flatnonzero(freq.any(axis=1)) if order else [0]
+    parts = [np.packbits(freq.any(axis=1)).tobytes()] if order else []
+    for r in rows:
+        present = freq[r] > 0
+        parts += [np.packbits(present).tobytes(), freq[r][present].astype('<u2').tobytes()]
+    return b''.join(parts)
+
+
+def _unpack_table(buf: memoryview, order: int) -> tuple[np.ndarray, int]:
+    """Bảng tần suất (256 x 256 với order 1, 1 x 256 với order 0) và số byte đã đọc."""
+    pos = 0
+
+    def bitmap():
+        nonlocal pos
+        if len(buf) < pos + 32:
+            raise ValueError("Incomplete rANS frequency table")
+        mask = np.unpackbits(np.frombuffer(buf, dtype=np.uint8, count=32, offset=pos)).astype(bool)
+        pos += 32
+        return mask
+
+    rows = np.flatnonzero(bitmap()) if order else [0]
+    freq = np.zeros((256 if order else 1, 256), dtype=np.int64)
+    for r in rows:
+        present = bitmap()
+        k = int(present.sum())
+        if len(buf) < pos + 2 * k:
+            raise ValueError("Incomplete rANS frequency table")
+        freq[r, present] = np.frombuffer(buf, dtype='<u2', count=k, offset=pos)
+        pos += 2 * k
+        if freq[r].sum() != 1 << PROB_BITS[order]:
+            raise ValueError("Invalid rANS frequency table")
+    return freq, pos
+
+
+def _cost(counts: np.ndarray, freq: np.ndarray, bits: int) -> float:
+    """Số byte ước lượng của dữ liệu mã hóa bằng bảng freq (chưa tính bảng)."""
+    used = counts > 0
+    return float(-(counts[used] * (np.log2(freq[used]) - bits)).sum()) / 8
+
+
+class RANSCompressor(Compressor):
+    def __init__(self, order: int = 0, transform=None):
+        super().__init__(transform)
+        if order not in (0, 1):
+            raise ValueError(f"Invalid rANS order: {order}")
+        self.order = order
+
+    def _model(self, flat: np.ndarray, starts: np.ndarray) -> tuple[int, np.ndarray, np.ndarray]:
+        """Chọn order và dựng bảng tần suất: (order, bảng, ngữ cảnh của từng symbol)."""
+        counts0 = np.bincount(flat, minlength=256)[None, :]
+        freq0 = _normalize(counts0, PROB_BITS[0])
+        if self.order == 0:
+            return 0, freq0, None
+        ctx = _contexts(flat, starts)
+        counts1 = np.bincount(ctx.astype(np.int64) * 256 + flat, minlength=256 * 256).reshape(256, 256)
+        freq1 = _normalize(counts1, PROB_BITS[1])
+        size0 = _cost(counts0, freq0, PROB_BITS[0]) + len(_pack_table(freq0, 0))
+        size1 = _cost(counts1, freq1, PROB_BITS[1]) + len(_pack_table(freq1, 1))
+        if size1 < size0:
+            return 1, freq1, ctx
+        return 0, freq0, None
+
+    def encode(self, img: np.ndarray, progress=None) -> tuple[bytes, bytes]:
+        filtered, transform = self._forward(img)
+        flat = np.ravel(filtered)
+        n = flat.size
+        if n == 0:
+            return b'', b''
+        lanes = _lane_count(n)
+        seg = -(-n // lanes)
+        starts = np.arange(lanes) * seg
+        lanes = int(np.count_nonzero(starts < n))
+        starts = starts[:lanes]
+
+        with stage("histogram"):
+            order, freq, ctx = self._model(flat, starts)
+        with stage("table"):
+            cum = np.zeros_like(freq)
+            np.cumsum(freq[:, :-1], axis=1, out=cum[:, 1:])
+            # Chỉ số ngữ cảnh * 256 + symbol (vừa uint16), xếp thành (bước, đoạn) để mỗi bước
+            # đọc một hàng
+            index = flat.astype(np.uint16)
+            if order:
+                index |= ctx.astype(np.uint16) << 8
+            index = _by_step(index, lanes, seg)
+            # Tần suất và cum < 2^16: bảng theo symbol giữ uint32, từng bước mới nới sang uint64.
+            # Tra bảng theo từng khối hàng để chỉ số không bị chép sang intp cả mảng một lúc
+            sym_freq = np.empty(index.shape, dtype=np.uint32)
+            sym_cum = np.empty(index.shape, dtype=np.uint32)
+            freq32, cum32 = freq.astype(np.uint32).ravel(), cum.astype(np.uint32).ravel()
+            for i in range(0, seg, _TABLE_ROWS):
+                rows = slice(i, i + _TABLE_ROWS)
+                # mode='clip' (chỉ số luôn hợp lệ) để take ghi thẳng vào out, không qua bộ đệm
+                np.take(freq32, index[rows], out=sym_freq[rows], mode='clip')
+                np.take(cum32, index[rows], out=sym_cum[rows], mode='clip')
+            del index
+
+        # Chỉ đoạn cuối có thể ngắn hơn seg
+        last = n - (lanes - 1) * seg
+        bits = np.uint64(PROB_BITS[order])
+        shift = np.uint64(32 - PROB_BITS[order])
+        x = np.full(lanes, _RANS_L, dtype=np.uint64)
+        chunks = []
+        with stage("pack"):
+            # Mã hóa ngược từ bước cuối; mỗi bước một symbol của mọi đoạn còn dữ liệu
+            for t in range(seg - 1, -1, -1):
+                active = lanes if t < last else lanes - 1
+                f = sym_freq[t, :active].astype(np.uint64)
+                xa = x[:active]
+                emit = xa >= f << shift
+                chunks.append((xa[emit] & np.uint64(0xFFFF)).astype('<u2'))
+                xa[emit] >>= np.uint64(16)
+                q, r = np.divmod(xa, f)
+                x[:active] = (q << bits) + r + sym_cum[t, :active].astype(np.uint64)
+                if progress:
+                    progress(n - t * lanes, n)
+            words = np.concatenate(chunks[::-1]) if chunks else np.zeros(0, dtype='<u2')
+        data = x.astype('<u4').tobytes() + words.tobytes()
+        count("symbols", n)
+        count("encoded_bytes", len(data))
+        metadata = _HEADER.pack(order, lanes) + _pack_table(freq, order) + transform
+        return data, metadata
+
+    def decode(self, data: bytes, metadata, shape, progress=None) -> np.ndarray:
+        if not metadata:
+            return np.zeros(shape, dtype=np.uint8)
+        if len(metadata) < _HEADER.size:
+            raise ValueError("Invalid rANS metadata")
+        order, lanes = _HEADER.unpack_from(metadata)
+        if order not in (0, 1) or lanes == 0:
+            raise ValueError("Invalid rANS metadata")
+        with stage("table"):
+            freq, size = _unpack_table(memoryview(metadata)[_HEADER.size:], order)
+            cum = np.zeros_like(freq)
+            np.cumsum(freq[:, :-1], axis=1, out=cum[:, 1:])
+            # Chỉ các ngữ cảnh có mặt được đánh số lại 0..k-1; bảng theo (số thứ tự << bits
+            # | slot) cho symbol, tần suất và slot - cum của symbol
+            bits = PROB_BITS[order]
+            scale = 1 << bits
+            rows = np.flatnonzero(freq.any(axis=1))
+            row_of = np.zeros(len(freq), dtype=np.uint64)
+            row_of[rows] = np.arange(len(rows), dtype=np.uint64) << np.uint64(bits)
+            freq, cum = freq[rows], cum[rows]
+            # Slot thứ j của symbol s (tần suất f) có sym_freq = f và bias = j - cum[s]
+            f = freq.ravel()
+            lookup = np.repeat(np.tile(np.arange(256, dtype=np.uint8), len(rows)), f)
+            sym_freq = np.repeat(f.astype(np.uint32), f)
+            bias = np.tile(np.arange(scale, dtype=np.uint32), len(rows)) - np.repeat(cum.ravel().astype(np.uint32), f)
+        transform = bytes(metadata[_HEADER.size + size:])
+
+        n = int(np.prod(shape))
+        seg = -(-n // lanes)
+        # Chỉ đoạn cuối có thể ngắn hơn seg (last symbol)
+        last = n - (lanes - 1) * seg
+        if last <= 0:
+            raise ValueError("Invalid rANS lane count")
+        count("encoded_bytes", len(data))
+        if len(data) < 4 * lanes or (len(data) - 4 * lanes) % 2:
+            raise ValueError("Incomplete rANS data")
+        x = np.frombuffer(data, dtype='<u4', count=lanes).astype(np.uint64)
+        # Các word giữ nguyên uint16 trong buffer, chỉ phần được đọc ở mỗi bước mới nới sang uint64
+        words = np.frombuffer(data, dtype='<u2', offset=4 * lanes)
+
+        out = np.empty((seg, lanes), dtype=np.uint8)
+        # Ngữ cảnh order 1 (symbol trước của từng đoạn) dạng row_of[symbol]
+        prev = np.full(lanes, row_of[0], dtype=np.uint64)
+        mask = np.uint64(scale - 1)
+        pos = 0
+        with stage("unpack"):
+            for t in range(seg):
+                active = lanes if t < last else lanes - 1
+                xa = x[:active]
+                i = xa & mask
+                if order:
+                    i |= prev[:active]
+                s = lookup[i]
+                out[t, :active] = s
+                xa = sym_freq[i] * (xa >> np.uint64(bits)) + bias[i]
+                need = xa < _RANS_L
+                k = int(np.count_nonzero(need))
+                if k:
+                    if pos + k > len(words):
+                        raise ValueError("Incomplete rANS data")
+                    xa[need] = (xa[need] << np.uint64(16)) | words[pos:pos + k].astype(np.uint64)
+                    pos += k
+                x[:active] = xa
+                if order:
+                    prev[:active] = row_of[s]
+                if progress:
+                    progress(min(n, (t + 1) * lanes), n)
+        if pos != len(words) or np.any(x != _RANS_L):
+            raise ValueError("Corrupt rANS data")
+        return self._inverse(np.ravel(out.T)[:n], shape, transform)
+
+    def save_file(self, path: str, data: bytes, metadata, shape):
+        write_file(path, self.name, shape, metadata, data)
+
+    def load_file(self, path: str):
+        with map_file(path) as buf:
+            return self.from_bytes(buf)
+
+    def from_bytes(self, buf):
+        """Giải nén nội dung file .rans; buf (bytes/memoryview/mmap) không bị chép lại."""
+        header = read_header(buf, self.name, ".rans")
+        return self.decode(header.data, bytes(header.metadata), header.shape)
+
+    @property
+    def name(self):
+        return "rANS"
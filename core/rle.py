@@ -1,48 +1,258 @@
 # core/rle.py
 from .compressor import Compressor
+from .fileformat import read_header, write_file
+from .huffman import HuffmanCompressor
+from .profiling import stage
+from .utils import map_file
 import numpy as np
 import struct
 
+# Số pixel xử lý mỗi lượt khi dò run / bung run: progress được gọi sau mỗi lượt nên thao tác
+# hủy được giữa chừng
+_RUN_CHUNK = 1 << 20
+
+
+def _run_bounds(flat: np.ndarray, progress=None, scale: float = 1.0) -> np.ndarray:
+    """Ranh giới run: vị trí 0, mọi vị trí khác pixel đứng trước, và len(flat).
+
+    Dò theo từng lượt _RUN_CHUNK pixel; progress nhận số pixel đã dò nhân với scale (phần
+    của tổng tiến độ dành cho bước này).
+    """
+    n = len(flat)
+    edges = np.empty(n + 1, dtype=bool)
+    edges[0] = edges[-1] = True
+    for start in range(0, n - 1, _RUN_CHUNK):
+        stop = min(start + _RUN_CHUNK, n - 1)
+        np.not_equal(flat[start + 1:stop + 1], flat[start:stop], out=edges[start + 1:stop + 1])
+        if progress:
+            progress(int((stop + 1) * scale), n)
+    return np.flatnonzero(edges)
+
+
+def _chunk_ranges(offsets: np.ndarray, total: int) -> list[tuple[int, int]]:
+    """Chia các phần tử bắt đầu tại `offsets` (tăng dần, phủ [0, total)) thành các khoảng chỉ
+    số [a, b) liền nhau, mỗi khoảng phủ khoảng _RUN_CHUNK pixel."""
+    marks = np.searchsorted(offsets, np.arange(0, total, _RUN_CHUNK), side='right') - 1
+    splits = np.unique(np.concatenate(([0], np.maximum(marks, 0), [len(offsets)]))).tolist()
+    return list(zip(splits[:-1], splits[1:]))
+
+
 class RLECompressor(Compressor):
-    def encode(self, img: np.ndarray):
-        flat = img.flatten()
-        enc = bytearray()
-        i = 0
-        while i < len(flat):
-            val = flat[i]
-            count = 1
-            i += 1
-            while i < len(flat) and flat[i] == val and count < 255:
-                count += 1
-                i += 1
-            enc.append(val)
-            enc.append(count)
-        return bytes(enc), None
-
-    def decode(self, data: bytes, metadata, shape):
-        out = []
-        i = 0
-        while i < len(data):
-            val, cnt = data[i], data[i+1]
-            out.extend([val] * cnt)
-            i += 2
-        return np.array(out, dtype=np.uint8).reshape(shape)
+    def encode(self, img: np.ndarray, progress=None):
+        """metadata là header của transform, hoặc None nếu không dùng transform."""
+        filtered, transform = self._forward(img)
+        flat = np.ravel(filtered)
+        if len(flat) == 0:
+            return b'', transform or None
+
+        with stage("runs"):
+            bounds = _run_bounds(flat, progress)
+            values = flat[bounds[:-1]]
+            lengths = np.diff(bounds)
+
+            if lengths.max() > 255:
+                # Run dài hơn 255 tách thành các cặp 255, ..., 255, phần dư
+                pieces = (lengths + 254) // 255
+                counts = np.full(int(pieces.sum()), 255, dtype=np.uint8)
+                counts[np.cumsum(pieces) - 1] = lengths - 255 * (pieces - 1)
+                values = np.repeat(values, pieces)
+                lengths = counts
+
+            enc = np.empty(2 * len(values), dtype=np.uint8)
+            enc[0::2] = values
+            enc[1::2] = lengths
+        return enc.tobytes(), transform or None
+
+    def decode(self, data: bytes, metadata, shape, progress=None):
+        pairs = np.frombuffer(data, dtype=np.uint8)
+        if len(pairs) % 2:
+            raise ValueError("Corrupt RLE data: odd number of bytes")
+        with stage("expand"):
+            values, counts = pairs[0::2], pairs[1::2]
+            total = int(counts.sum(dtype=np.int64))
+            out = np.empty(total, dtype=np.uint8)
+            # Mỗi lượt bung _RUN_CHUNK / 16 cặp (tối đa 255 pixel mỗi cặp)
+            step = _RUN_CHUNK >> 4
+            pos = 0
+            for i in range(0, len(values), step):
+                piece = np.repeat(values[i:i + step], counts[i:i + step])
+                out[pos:pos + piece.size] = piece
+                pos += piece.size
+                if progress:
+                    progress(pos, total)
+        return self._inverse(out, shape, metadata)
 
     def save_file(self, path: str, data: bytes, metadata, shape):
-        h, w, c = shape
-        with open(path, "wb") as f:
-            f.write(b"RLE0")
-            f.write(struct.pack("<III", h, w, c))
-            f.write(data)
+        write_file(path, self.name, shape, metadata, data)
 
     def load_file(self, path: str):
-        with open(path, "rb") as f:
-            if f.read(4) != b"RLE0":
-                raise ValueError("Invalid .rle file")
-            h, w, c = struct.unpack("<III", f.read(12))
-            data = f.read()
-            return self.decode(data, None, (h, w, c))
+        with map_file(path) as buf:
+            return self.from_bytes(buf)
+
+    def from_bytes(self, buf):
+        """Giải nén nội dung file .rle; buf (bytes/memoryview/mmap) không bị chép lại."""
+        header = read_header(buf, self.name, ".rle")
+        return self.decode(header.data, bytes(header.metadata), header.shape)
+
+    @property
+    def name(self):
+        return "RLE"
+
+# RLEV: run lặp ngắn hơn bấy nhiêu pixel được gộp vào literal run
+_MIN_REPEAT = 3
+_SECTION = struct.Struct("<III")
+
+
+def _varint_encode(values: np.ndarray) -> np.ndarray:
+    """Mã hóa dãy số nguyên không âm thành varint LEB128 (7 bit mỗi byte, bit 7 = còn tiếp)."""
+    values = values.astype(np.uint64)
+    nbytes = np.ones(values.size, dtype=np.int64)
+    for k in range(1, 10):
+        nbytes += values >= np.uint64(1 << (7 * k))
+    offsets = np.cumsum(nbytes) - nbytes
+    out = np.zeros(int(nbytes.sum()), dtype=np.uint8)
+    for k in range(int(nbytes.max(initial=0))):
+        m = nbytes > k
+        byte = (values[m] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        out[offsets[m] + k] = byte | np.where(nbytes[m] > k + 1, np.uint64(0x80), np.uint64(0))
+    return out
+
+
+def _varint_decode(buf: np.ndarray) -> np.ndarray:
+    """Ngược lại của _varint_encode."""
+    if buf.size and buf[-1] & 0x80:
+        raise ValueError("Corrupt RLEV data: truncated varint")
+    ends = np.flatnonzero(buf < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    nbytes = ends - starts + 1
+    if nbytes.size and nbytes.max() > 10:
+        raise ValueError("Corrupt RLEV data: varint too long")
+    values = np.zeros(ends.size, dtype=np.uint64)
+    for k in range(int(nbytes.max(initial=0))):
+        m = nbytes > k
+        values[m] |= (buf[starts[m] + k] & np.uint64(0x7F)).astype(np.uint64) << np.uint64(7 * k)
+    return values
+
+
+class VarRLECompressor(Compressor):
+    """
+    RLE với độ dài varint: dữ liệu là dãy token, mỗi token mở đầu bằng một varint h.
+    h chẵn: run lặp dài h/2 + _MIN_REPEAT của một giá trị; h lẻ: literal run gồm h//2 + 1 byte
+    chép nguyên (các pixel không lặp không tốn thêm byte đếm). Các varint và các byte giá
+    trị nằm ở hai phần riêng nên giải mã được vector hóa hoàn toàn; với entropy=True mỗi
+    phần còn được mã hóa Huffman bằng bảng mã của HuffmanCompressor (bỏ qua nếu không nhỏ hơn).
+
+    Dữ liệu: 2 phần (varint, giá trị), mỗi phần = số byte gốc, độ dài metadata, độ dài dữ
+    liệu (uint32) | metadata Huffman | dữ liệu (metadata rỗng: dữ liệu lưu thô).
+    """
+
+    def __init__(self, entropy: bool = True, transform=None):
+        super().__init__(transform)
+        self.entropy = entropy
+
+    def _pack_section(self, section: np.ndarray) -> bytes:
+        if self.entropy and section.size:
+            data, meta = HuffmanCompressor().encode(section)
+            if len(meta) + len(data) < section.size:
+                return _SECTION.pack(section.size, len(meta), len(data)) + meta + data
+        return _SECTION.pack(section.size, 0, section.size) + section.tobytes()
+
+    @staticmethod
+    def _unpack_section(buf: memoryview, pos: int) -> tuple[np.ndarray, int]:
+        if pos + _SECTION.size > len(buf):
+            raise ValueError("Incomplete RLEV data: missing section header")
+        count, meta_len, data_len = _SECTION.unpack_from(buf, pos)
+        pos += _SECTION.size
+        if pos + meta_len + data_len > len(buf):
+            raise ValueError("Incomplete RLEV data: truncated section")
+        meta = bytes(buf[pos:pos + meta_len])
+        data = buf[pos + meta_len:pos + meta_len + data_len]
+        pos += meta_len + data_len
+        if not meta_len:
+            if data_len != count:
+                raise ValueError("RLEV section size mismatch")
+            return np.frombuffer(data, dtype=np.uint8), pos
+        return HuffmanCompressor().decode(data, meta, (count,)), pos
+
+    def encode(self, img: np.ndarray, progress=None):
+        """metadata là header của transform (rỗng nếu không dùng transform)."""
+        filtered, transform = self._forward(img)
+        flat = np.ravel(filtered)
+        n = len(flat)
+        if n == 0:
+            return self._pack_section(flat) * 2, transform
+
+        with stage("runs"):
+            # Dò run chiếm nửa đầu tiến độ, gom giá trị theo token nửa sau
+            bounds = _run_bounds(flat, progress, 0.5)
+            lengths = np.diff(bounds)
+            repeat = lengths >= _MIN_REPEAT
+
+            # Token mới tại mỗi run lặp và tại run ngắn đầu tiên sau một run lặp
+            first = repeat.copy()
+            first[0] = True
+            first[1:] |= repeat[:-1]
+            heads = np.flatnonzero(first)
+            tok_start = bounds[heads]
+            tok_len = np.add.reduceat(lengths, heads)
+            tok_rep = repeat[heads]
+            header = np.where(tok_rep, (tok_len - _MIN_REPEAT) << 1, ((tok_len - 1) << 1) | 1)
+
+            # Run lặp góp 1 byte giá trị, literal run góp toàn bộ pixel của nó
+            vcount = np.where(tok_rep, 1, tok_len)
+            vstart = np.cumsum(vcount) - vcount
+            values = np.empty(int(vcount.sum()), dtype=np.uint8)
+            for a, b in _chunk_ranges(tok_start, n):
+                lo, hi = int(vstart[a]), int(vstart[b - 1] + vcount[b - 1])
+                values[lo:hi] = flat[np.repeat(tok_start[a:b] - vstart[a:b], vcount[a:b]) + np.arange(lo, hi)]
+                if progress:
+                    progress((n + int(tok_start[b - 1] + tok_len[b - 1])) // 2, n)
+
+        data = self._pack_section(_varint_encode(header)) + self._pack_section(values)
+        return data, transform
+
+    def decode(self, data: bytes, metadata, shape, progress=None):
+        buf = memoryview(data)
+        headers, pos = self._unpack_section(buf, 0)
+        values, pos = self._unpack_section(buf, pos)
+        if pos != len(buf):
+            raise ValueError("Trailing data after RLEV sections")
+
+        with stage("expand"):
+            header = _varint_decode(headers).astype(np.int64)
+            tok_rep = (header & 1) == 0
+            tok_len = np.where(tok_rep, (header >> 1) + _MIN_REPEAT, (header >> 1) + 1)
+            vcount = np.where(tok_rep, 1, tok_len)
+            n = int(np.prod(shape))
+            if int(tok_len.sum()) != n or int(vcount.sum()) != values.size:
+                raise ValueError("Corrupt RLEV data: run lengths do not match image size")
+
+            # Pixel thứ j của token lấy giá trị thứ j (literal) hoặc giá trị duy nhất (run lặp)
+            vstart = np.cumsum(vcount) - vcount
+            ostart = np.cumsum(tok_len) - tok_len
+            out = np.empty(n, dtype=np.uint8)
+            for a, b in _chunk_ranges(ostart, n):
+                lo, hi = int(ostart[a]), int(ostart[b - 1] + tok_len[b - 1])
+                tl = tok_len[a:b]
+                step = np.repeat(~tok_rep[a:b], tl)
+                src = np.repeat(vstart[a:b], tl) + (np.arange(lo, hi) - np.repeat(ostart[a:b], tl)) * step
+                out[lo:hi] = values[src]
+                if progress:
+                    progress(hi, n)
+        return self._inverse(out, shape, metadata)
+
+    def save_file(self, path: str, data: bytes, metadata, shape):
+        write_file(path, self.name, shape, metadata, data)
+
+    def load_file(self, path: str):
+        with map_file(path) as buf:
+            return self.from_bytes(buf)
+
+    def from_bytes(self, buf):
+        """Giải nén nội dung file .rlev; buf (bytes/memoryview/mmap) không bị chép lại."""
+        header = read_header(buf, self.name, ".rlev")
+        return self.decode(header.data, bytes(header.metadata), header.shape)
 
     @property
     def name(self):
-        return "RLE"
\ No newline at end of file
+        return "RLEV"
@@ -1,17 +1,44 @@
 # core/utils.py
+import mmap
+import os
+from contextlib import contextmanager
+
 import numpy as np
 
+from .metrics import mse_psnr
+from .profiling import count
+
 def calculate_mse_psnr(orig: np.ndarray, rec: np.ndarray):
-    M = orig.shape[0] * orig.shape[1]
-    N = orig.shape[2]
-    se = (orig.astype(float) - rec.astype(float)) ** 2
-    mse = np.sum(se) / (M * N)
-    psnr = float('inf') if mse == 0 else 10 * np.log10((255**2) / mse)
-    return mse, psnr
+    # Tính theo dải với bộ cộng dồn số nguyên (core.metrics), không tạo mảng float cả ảnh
+    return mse_psnr(orig, rec)
 
 def format_bytes(size: int) -> str:
     for unit in ['B', 'KB', 'MB', 'GB']:
         if size < 1024:
             return f"{size:.1f} {unit}"
         size /= 1024
-    return f"{size:.1f} TB"
\ No newline at end of file
+    return f"{size:.1f} TB"
+
+@contextmanager
+def map_file(path: str):
+    """
+    Ánh xạ file chỉ đọc bằng mmap và trả về memoryview của toàn bộ nội dung, không chép
+    dữ liệu vào bộ nhớ. File rỗng cho memoryview rỗng.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield memoryview(b'')
+            return
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mm)
+    count("bytes_mapped", len(view))
+    try:
+        yield view
+    finally:
+        try:
+            view.release()
+            mm.close()
+        except BufferError:
+            # Còn mảng trỏ vào vùng ánh xạ (ví dụ traceback giữ biến cục bộ của decoder):
+            # mmap tự đóng khi các mảng đó được giải phóng
+            pass
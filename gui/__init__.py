@@ -1,12 +1,26 @@
 # gui/__init__.py
 """
 Gói GUI sử dụng CustomTkinter
+
+Các lớp giao diện được nạp khi dùng lần đầu, nên `gui.preview` (chỉ cần NumPy) import được
+trên máy không có customtkinter/màn hình.
 """
+import importlib
 
-from .app import ImageCompressionApp
-from .components import ImageCard
+_LAZY = {
+    "ImageCompressionApp": ".app",
+    "ImageCard": ".components",
+}
 
 __all__ = [
     "ImageCompressionApp",
     "ImageCard"
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -1,30 +1,59 @@
 # gui/app.py
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
-from PIL import Image
-import numpy as np
-import os, time, uuid
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-
-from core.rle import RLECompressor
-from core.huffman import HuffmanCompressor
-from core.utils import calculate_mse_psnr, format_bytes
+import os, time
+from functools import cached_property, partial
+
+from gui.worker import BackgroundWorker
+# PIL, NumPy và các codec được nạp khi dùng lần đầu: cửa sổ hiện ra trước, không chờ import
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
+METHODS = ("RLE", "Huffman")
+# Thời gian mục tiêu (giây) hiển thị ở chân trang: từ lúc chạy main.py tới khi cửa sổ sẵn sàng,
+# và vẽ lại kết quả sau khi nén xong
+STARTUP_TARGET = 1.0
+REDRAW_TARGET = 0.1
+
 class ImageCompressionApp(ctk.CTk):
-    def __init__(self):
+    def __init__(self, started=None):
         super().__init__()
         self.title("Nén Ảnh Lossless - RLE vs Huffman")
         self.geometry("1700x1000")
 
-        self.compressors = {"RLE": RLECompressor(), "Huffman": HuffmanCompressor()}
         self.img = None
         self.shape = None
+        self.preview = None
         self.results = {}
+        self.stage = {}
+        # Mỗi thuật toán một luồng để RLE và Huffman chạy đồng thời
+        self.worker = BackgroundWorker(self, max_workers=len(METHODS))
 
         self.setup_ui()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        if started is not None:
+            self.after_idle(self.report_time, "Khởi động", time.perf_counter() - started, STARTUP_TARGET)
+
+    @cached_property
+    def compressors(self):
+        from core.rle import RLECompressor
+        from core.huffman import HuffmanCompressor
+        return {"RLE": RLECompressor(), "Huffman": HuffmanCompressor()}
+
+    @cached_property
+    def cache(self):
+        """Ảnh giải nén dùng chung cho hiển thị, kiểm tra lossless và xuất PNG."""
+        from core.cache import DecodeCache
+        return DecodeCache()
+
+    def report_time(self, what, seconds, target):
+        ok = seconds <= target
+        self.timing.configure(text=f"{what}: {seconds:.3f}s (mục tiêu ≤ {target}s)",
+                              text_color="#94a3b8" if ok else "#f87171")
+
+    def on_close(self):
+        self.worker.shutdown()
+        self.destroy()
 
     def setup_ui(self):
         # Header
@@ -56,74 +85,101 @@ class ImageCompressionApp(ctk.CTk):
         footer = ctk.CTkFrame(self, height=40, fg_color="#1e293b", corner_radius=0)
         footer.pack(fill="x")
         footer.pack_propagate(False)
-        ctk.CTkLabel(footer, text="© 2025 - Đồ án Nén Ảnh Lossless", text_color="#94a3b8").pack(pady=10)
+        ctk.CTkLabel(footer, text="© 2025 - Đồ án Nén Ảnh Lossless", text_color="#94a3b8").pack(side="left", padx=40)
+        self.timing = ctk.CTkLabel(footer, text="", text_color="#94a3b8")
+        self.timing.pack(side="right", padx=40)
 
     def load_image(self):
         path = filedialog.askopenfilename(filetypes=[("Image", "*.png *.jpg *.jpeg *.bmp")])
         if not path: return
+        from PIL import Image
+        import numpy as np
+        from gui.preview import downsample
         try:
             img = Image.open(path).convert("RGB")
-            self.img = np.array(img, dtype=np.uint8)
-            self.shape = self.img.shape
-            self.img_path = path
-            self.process()
+            img = np.array(img, dtype=np.uint8)
         except Exception as e:
             messagebox.showerror("Lỗi", str(e))
+            return
+        # Ảnh mới: bỏ mọi việc đang chạy của ảnh cũ
+        self.worker.cancel_all()
+        self.img = img
+        self.shape = self.img.shape
+        # Thu nhỏ một lần về kích thước hiển thị; ảnh giải nén được thu nhỏ ở luồng nền
+        self.preview = downsample(img)
+        self.img_path = path
+        self.process()
 
     def process(self):
         for w in self.result_area.winfo_children():
             w.destroy()
         self.progress.set(0)
-        self.update()
+        self.btn_verify.configure(state="disabled")
+        self.btn_export.configure(state="disabled")
 
         h, w, c = self.shape
         raw_kb = h * w * c // 1024
         orig_kb = os.path.getsize(self.img_path) // 1024
-        os.makedirs("output", exist_ok=True)
 
-        # RLE
-        self.progress.set(0.3)
-        self.update()
-        start = time.time()
-        rle_data, _ = self.compressors["RLE"].encode(self.img)
-        rle_time = time.time() - start
-        rle_compressed_kb = len(rle_data) // 1024  # Kích thước dữ liệu NÉN
-        rle_ratio = round(rle_compressed_kb / max(raw_kb, 1), 3)
-        temp_rle = f"output/temp_{uuid.uuid4().hex}.rle"
-        self.compressors["RLE"].save_file(temp_rle, rle_data, None, self.shape)
-        rle_file_kb = os.path.getsize(temp_rle) // 1024
-
-        # Huffman
-        self.progress.set(0.7)
-        self.update()
-        start = time.time()
-        huff_data, meta = self.compressors["Huffman"].encode(self.img)
-        huff_time = time.time() - start
-        huff_compressed_kb = len(huff_data) // 1024  # Kích thước dữ liệu NÉN
-        huff_ratio = round(huff_compressed_kb / max(raw_kb, 1), 3)
-        temp_huff = f"output/temp_{uuid.uuid4().hex}.huff"
-        self.compressors["Huffman"].save_file(temp_huff, huff_data, meta, self.shape)
-        huff_file_kb = os.path.getsize(temp_huff) // 1024
+        self.results = {}
+        self.stage = dict.fromkeys(METHODS, 0.0)
+        # Tạo codec và cache ở luồng giao diện trước khi các luồng nền dùng chung
+        self.compressors, self.cache
+        for method in METHODS:
+            self.worker.submit(partial(self.compress_job, method, self.img, self.shape),
+                               on_done=partial(self.on_compressed, method, orig_kb, raw_kb),
+                               on_progress=partial(self.on_progress, method),
+                               on_error=self.on_error)
 
-        self.progress.set(1.0)
-        self.results = {
-            "RLE": (rle_data, None, temp_rle, rle_file_kb, rle_compressed_kb, rle_ratio, rle_time),
-            "Huffman": (huff_data, meta, temp_huff, huff_file_kb, huff_compressed_kb, huff_ratio, huff_time)
-        }
+    def compress_job(self, method, img, shape, report):
+        """
+        Chạy trên luồng nền: nén, giải nén lại vào cache và thu nhỏ để hiển thị. Không ghi đĩa:
+        kích thước file tính từ độ dài dữ liệu, file chỉ được ghi khi xuất. Không chạm vào widget.
+        """
+        from gui.preview import downsample
+        comp = self.compressors[method]
+        raw_kb = img.nbytes // 1024
+
+        # Nén chiếm nửa đầu thanh tiến độ, giải nén nửa sau
+        start = time.perf_counter()
+        data, meta = comp.encode(img, progress=lambda done, total: report(0.5 * done / max(total, 1)))
+        elapsed = time.perf_counter() - start
+        compressed_kb = len(data) // 1024  # Kích thước dữ liệu NÉN
+        ratio = round(compressed_kb / max(raw_kb, 1), 3)
+        file_kb = comp.file_size(data, meta) // 1024
 
+        rec = self.cache.decode(comp, data, meta, shape,
+                                progress=lambda done, total: report(0.5 + 0.5 * done / max(total, 1)))
+        return data, meta, file_kb, compressed_kb, ratio, elapsed, downsample(rec)
+
+    def on_progress(self, method, value):
+        self.stage[method] = value
+        self.progress.set(sum(self.stage.values()) / len(self.stage))
+
+    def on_compressed(self, method, orig_kb, raw_kb, result):
+        self.results[method] = result
+        if len(self.results) < len(METHODS):
+            return
+        self.progress.set(1.0)
         self.btn_verify.configure(state="normal")
         self.btn_export.configure(state="normal")
         self.show_results(orig_kb, raw_kb)
 
+    def decoded(self, method, progress=None):
+        """Ảnh giải nén của một thuật toán, lấy từ cache (chỉ giải nén nếu đã bị loại khỏi cache)."""
+        data, meta = self.results[method][:2]
+        return self.cache.decode(self.compressors[method], data, meta, self.shape, progress)
+
+    def on_error(self, error):
+        self.progress.set(0)
+        messagebox.showerror("Lỗi", str(error))
+
     def show_results(self, orig_kb, raw_kb):
+        start = time.perf_counter()
         # Xóa nội dung cũ
         for widget in self.result_area.winfo_children():
             widget.destroy()
 
-        # Giải nén lại để hiển thị
-        rle_rec = self.compressors["RLE"].decode(*self.results["RLE"][:2], self.shape)
-        huff_rec = self.compressors["Huffman"].decode(*self.results["Huffman"][:2], self.shape)
-
         # Tính toán thống kê với nhãn rõ ràng
         stats = [
             # Ảnh Gốc: raw_kb là raw_standard
@@ -131,64 +187,58 @@ class ImageCompressionApp(ctk.CTk):
 
             # RLE: raw_kb là raw_standard, rle_compressed_kb là 'compressed'
             {
-                "file": f"{self.results['RLE'][3]:,} KB",
-                "compressed": f"{self.results['RLE'][4]:,} KB",
+                "file": f"{self.results['RLE'][2]:,} KB",
+                "compressed": f"{self.results['RLE'][3]:,} KB",
                 "raw_standard": f"{raw_kb:,} KB",
-                "ratio": f"{self.results['RLE'][5]}x",
-                "time": f"{self.results['RLE'][6]:.3f}s"
+                "ratio": f"{self.results['RLE'][4]}x",
+                "time": f"{self.results['RLE'][5]:.3f}s"
             },
 
             # Huffman: raw_kb là raw_standard, huff_compressed_kb là 'compressed'
             {
-                "file": f"{self.results['Huffman'][3]:,} KB",
-                "compressed": f"{self.results['Huffman'][4]:,} KB",
+                "file": f"{self.results['Huffman'][2]:,} KB",
+                "compressed": f"{self.results['Huffman'][3]:,} KB",
                 "raw_standard": f"{raw_kb:,} KB",
-                "ratio": f"{self.results['Huffman'][5]}x",
-                "time": f"{self.results['Huffman'][6]:.3f}s"
+                "ratio": f"{self.results['Huffman'][4]}x",
+                "time": f"{self.results['Huffman'][5]:.3f}s"
             }
         ]
 
-        # Hiển thị 3 ảnh ngang hàng
-        from gui.components import ComparisonRow
-        ComparisonRow(self.result_area, self.img, rle_rec, huff_rec, stats)
+        # Hiển thị 3 ảnh xem trước ngang hàng (đã thu nhỏ sẵn ở luồng nền)
+        from gui.components import ComparisonRow, RatioChart
+        ComparisonRow(self.result_area, self.preview, self.results["RLE"][6], self.results["Huffman"][6], stats)
 
         # Biểu đồ tỉ lệ nén
-        fig = plt.Figure(figsize=(10, 4), facecolor="#0f172a")
-        ax = fig.add_subplot(111)
-        methods = ["RLE", "Huffman"]
-        ratios = [self.results["RLE"][5], self.results["Huffman"][5]]
-        colors = ["#22c55e" if r < 1 else "#ef4444" for r in ratios]
-        bars = ax.bar(methods, ratios, color=colors, edgecolor="white", linewidth=1.5)
-        ax.set_ylabel("Tỉ lệ nén", fontsize=14, color="white")
-        ax.set_title("So sánh hiệu suất nén", fontsize=18, color="white", pad=20)
-        ax.axhline(1, color="#f87171", linestyle="--", linewidth=2, label="Không nén")
-        ax.legend()
-
-        for bar, ratio in zip(bars, ratios):
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width() / 2, height + max(ratios) * 0.02,
-                    f'{ratio}x', ha='center', va='bottom', fontweight='bold', fontsize=14, color="white")
-
-        ax.tick_params(colors='white')
-        ax.spines['bottom'].set_color('white')
-        ax.spines['left'].set_color('white')
-        fig.patch.set_facecolor('#0f172a')
-        ax.set_facecolor('#0f172a')
-
-        canvas = FigureCanvasTkAgg(fig, self.result_area)
-        canvas.get_tk_widget().pack(pady=30)
-        canvas.draw()
+        RatioChart(self.result_area, {method: self.results[method][4] for method in METHODS})
+
+        self.update_idletasks()
+        self.report_time("Vẽ kết quả", time.perf_counter() - start, REDRAW_TARGET)
 
     def verify(self):
-        rle_rec = self.compressors["RLE"].decode(*self.results["RLE"][:2], self.shape)
-        huff_rec = self.compressors["Huffman"].decode(*self.results["Huffman"][:2], self.shape)
-        mse_rle, psnr_rle = calculate_mse_psnr(self.img, rle_rec)
-        mse_huff, psnr_huff = calculate_mse_psnr(self.img, huff_rec)
+        from core.metrics import is_lossless
+        from core.utils import calculate_mse_psnr
+        img = self.img
+
+        def job(report):
+            stats = {}
+            for i, method in enumerate(METHODS):
+                rec = self.decoded(method, progress=lambda done, total: report((i + done / max(total, 1)) / 2))
+                # Trường hợp thường gặp là khôi phục hoàn hảo: so sánh byte rẻ hơn tính MSE
+                stats[method] = (0.0, float('inf')) if is_lossless(img, rec) else calculate_mse_psnr(img, rec)
+            return stats
+
+        self.progress.set(0)
+        self.worker.submit(job, on_done=self.show_verify, on_progress=self.progress.set, on_error=self.on_error)
+
+    def show_verify(self, stats):
+        self.progress.set(1.0)
+        (mse_rle, psnr_rle), (mse_huff, psnr_huff) = stats["RLE"], stats["Huffman"]
         status = "HOÀN HẢO – LOSSLESS 100%" if mse_rle == 0 and mse_huff == 0 else "CÓ SAI LỆCH"
         messagebox.showinfo("Kiểm tra Lossless", f"RLE: MSE={mse_rle:.2e}, PSNR={'∞' if mse_rle==0 else f'{psnr_rle:.2f}dB'}\n"
                                                 f"Huffman: MSE={mse_huff:.2e}, PSNR={'∞' if mse_huff==0 else f'{psnr_huff:.2f}dB'}\n\n{status}")
 
     def show_export_menu(self):
+        os.makedirs("output", exist_ok=True)
         menu = ctk.CTkToplevel(self)
         menu.title("Xuất file")
         menu.geometry("300x250")
@@ -200,13 +250,25 @@ class ImageCompressionApp(ctk.CTk):
     def save(self, method, ext):
         path = filedialog.asksaveasfilename(defaultextension=ext, initialdir="output")
         if path:
-            import shutil
-            shutil.copy(self.results[method][2], path)
+            # Dữ liệu nén đang ở trong bộ nhớ: đóng gói và ghi file bằng một lần write
+            data, meta = self.results[method][:2]
+            try:
+                self.compressors[method].save_file(path, data, meta, self.shape)
+            except OSError as e:
+                messagebox.showerror("Lỗi", str(e))
+                return
             messagebox.showinfo("Thành công", f"Đã lưu: {path}")
 
     def save_png(self, method):
         path = filedialog.asksaveasfilename(defaultextension=".png", initialdir="output")
         if path:
-            img = self.compressors[method].decode(*self.results[method][:2], self.shape)
-            Image.fromarray(img).save(path)
-            messagebox.showinfo("Thành công", f"Đã lưu: {path}")
\ No newline at end of file
+            from PIL import Image
+
+            def job(report):
+                img = self.decoded(method, progress=lambda done, total: report(done / max(total, 1)))
+                Image.fromarray(img).save(path)
+                return path
+
+            self.progress.set(0)
+            self.worker.submit(job, on_done=lambda p: messagebox.showinfo("Thành công", f"Đã lưu: {p}"),
+                               on_progress=self.progress.set, on_error=self.on_error)
@@ -1,13 +1,19 @@
 # gui/components.py
 import customtkinter as ctk
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
 
 # from core.utils import format_bytes # Không cần vì app.py đã format rồi
 
+def preview_image(preview) -> ctk.CTkImage:
+    """CTkImage từ ảnh xem trước đã thu nhỏ (xem gui.preview), hiển thị đúng kích thước của nó."""
+    from PIL import Image  # Nạp khi cần để mở ứng dụng nhanh hơn
+    pil = Image.fromarray(preview)
+    return ctk.CTkImage(light_image=pil, dark_image=pil, size=pil.size)
+
+
 class ComparisonRow(ctk.CTkFrame):
     def __init__(self, master, orig_img, rle_img, huff_img, stats):
+        """orig_img, rle_img, huff_img là ảnh xem trước đã thu nhỏ, không phải ảnh đầy đủ."""
         super().__init__(master, fg_color="transparent")
         self.pack(fill="x", pady=20, padx=40)
 
@@ -25,12 +31,7 @@ class ComparisonRow(ctk.CTkFrame):
                 pady=(16, 8))
 
             # Ảnh
-            fig = plt.Figure(figsize=(6, 6), facecolor="#1f2937")
-            ax = fig.add_subplot(111)
-            ax.imshow(img)
-            ax.axis("off")
-            canvas = FigureCanvasTkAgg(fig, frame)
-            canvas.get_tk_widget().pack(pady=10)
+            ctk.CTkLabel(frame, text="", image=preview_image(img)).pack(pady=10)
 
             # Thông tin
             info = stats[i]
@@ -53,5 +54,40 @@ class ComparisonRow(ctk.CTkFrame):
         self.grid_columnconfigure((0, 1, 2), weight=1)
 
 
+class RatioChart(ctk.CTkFrame):
+    """Biểu đồ cột tỉ lệ nén vẽ thẳng trên Canvas, thay cho figure matplotlib."""
+
+    def __init__(self, master, ratios: dict, width=700, height=320):
+        super().__init__(master, fg_color="#0f172a", corner_radius=16)
+        self.pack(pady=30)
+        canvas = ctk.CTkCanvas(self, width=width, height=height, bg="#0f172a", highlightthickness=0)
+        canvas.pack(padx=20, pady=20)
+
+        canvas.create_text(width / 2, 20, text="So sánh hiệu suất nén", fill="white",
+                           font=("Arial", 18, "bold"))
+        left, right, top, bottom = 70, width - 30, 60, height - 40
+        # Trục tung luôn chứa mốc 1.0 (không nén) và chừa chỗ cho nhãn trên cột
+        y_max = max(1.0, *ratios.values()) * 1.15
+
+        def y(value):
+            return bottom - (bottom - top) * value / y_max
+
+        canvas.create_line(left, top, left, bottom, fill="white")
+        canvas.create_line(left, bottom, right, bottom, fill="white")
+        canvas.create_text(20, (top + bottom) / 2, text="Tỉ lệ nén", fill="white", angle=90, font=("Arial", 14))
+
+        slot = (right - left) / len(ratios)
+        for i, (method, ratio) in enumerate(ratios.items()):
+            x0, x1 = left + slot * (i + 0.25), left + slot * (i + 0.75)
+            canvas.create_rectangle(x0, y(ratio), x1, bottom, outline="white", width=1.5,
+                                    fill="#22c55e" if ratio < 1 else "#ef4444")
+            canvas.create_text((x0 + x1) / 2, y(ratio) - 4, text=f"{ratio}x", anchor="s", fill="white",
+                               font=("Arial", 14, "bold"))
+            canvas.create_text((x0 + x1) / 2, bottom + 6, text=method, anchor="n", fill="white")
+
+        canvas.create_line(left, y(1), right, y(1), fill="#f87171", dash=(6, 4), width=2)
+        canvas.create_text(right, y(1) - 4, text="Không nén", anchor="se", fill="#f87171")
+
+
 class ImageCard:
-    pass
\ No newline at end of file
+    pass
@@ -0,0 +1,96 @@
+# gui/worker.py
+"""
+Chạy các việc nặng (nén, giải nén, kiểm tra) trên luồng nền để cửa sổ Tk không bị treo.
+
+Tk không an toàn đa luồng nên luồng nền không bao giờ chạm vào widget: kết quả, tiến độ và lỗi
+được đưa vào hàng đợi, luồng Tk lấy ra định kỳ bằng after() rồi mới gọi callback.
+"""
+import queue
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+# Chu kỳ (ms) luồng Tk kiểm tra hàng đợi kết quả
+POLL_MS = 30
+
+
+class Job:
+    """Một việc đã gửi cho BackgroundWorker; cancel() khiến lần báo tiến độ kế tiếp dừng việc."""
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+
+class BackgroundWorker:
+    def __init__(self, root, max_workers: int = 2):
+        self.root = root
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="codec")
+        self._events = queue.SimpleQueue()
+        self._jobs = set()
+        self._poll_id = self.root.after(POLL_MS, self._poll)
+
+    def submit(self, fn, on_done=None, on_progress=None, on_error=None) -> Job:
+        """
+        Gọi fn(report) trên luồng nền. fn gọi report(giá trị) để báo tiến độ; on_progress(giá trị)
+        chạy trên luồng Tk. Khi xong, on_done(kết quả) hoặc on_error(exception) chạy trên luồng Tk.
+        Việc đã bị hủy không gọi callback nào.
+        """
+        job = Job()
+        self._jobs.add(job)
+
+        def report(value):
+            if job.cancelled:
+                raise CancelledError()
+            if on_progress:
+                self._events.put((job, on_progress, value, False))
+
+        def run():
+            try:
+                result = fn(report)
+            except CancelledError:
+                self._events.put((job, None, None, True))
+            except Exception as e:
+                self._events.put((job, on_error, e, True))
+            else:
+                self._events.put((job, on_done, result, True))
+
+        self._pool.submit(run)
+        return job
+
+    def cancel_all(self):
+        """Hủy mọi việc đang chờ hoặc đang chạy (ví dụ khi người dùng chọn ảnh mới)."""
+        for job in self._jobs:
+            job.cancel()
+        self._jobs.clear()
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._jobs)
+
+    def _poll(self):
+        while True:
+            try:
+                job, callback, value, final = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if final:
+                self._jobs.discard(job)
+            if job.cancelled:
+                continue
+            if callback:
+                callback(value)
+            elif isinstance(value, Exception):
+                # Không có on_error: báo lỗi như mọi callback Tk khác
+                self.root.report_callback_exception(type(value), value, value.__traceback__)
+        self._poll_id = self.root.after(POLL_MS, self._poll)
+
+    def shutdown(self):
+        self.cancel_all()
+        self.root.after_cancel(self._poll_id)
+        self._pool.shutdown(wait=False, cancel_futures=True)
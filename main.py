@@ -1,6 +1,11 @@
 # main.py
+import time
+
+# Mốc thời gian khởi động, hiển thị ở chân trang khi cửa sổ sẵn sàng
+STARTED = time.perf_counter()
+
 from gui.app import ImageCompressionApp
 
 if __name__ == "__main__":
-    app = ImageCompressionApp()
-    app.mainloop()
\ No newline at end of file
+    app = ImageCompressionApp(started=STARTED)
+    app.mainloop()